@@ -0,0 +1,103 @@
+# batch.py
+#
+# Non-interactive batch processing of a directory or glob of documents.
+# Example: python batch.py "incoming/*.pdf" --workers 4 --output-dir output/batch
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from logger import log_info, log_error
+from instrumentation import run
+
+SUPPORTED_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg")
+
+
+def collect_files(target, recursive=False):
+    """Expand a directory or glob pattern into a sorted list of supported files."""
+    if os.path.isdir(target):
+        pattern = os.path.join(target, "**", "*") if recursive else os.path.join(target, "*")
+    else:
+        pattern = target
+    paths = glob.glob(pattern, recursive=recursive)
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(SUPPORTED_EXTENSIONS))
+
+def output_stem(file_path, base_dir):
+    """Unique output name per input, e.g. test/sample-invoice.pdf -> test_sample-invoice_pdf."""
+    rel_path = os.path.relpath(file_path, base_dir)
+    return rel_path.replace(os.sep, "_").replace(".", "_")
+
+def process_file(file_path, output_dir, stem):
+    """Process one document inside a worker and return its manifest entry."""
+    # Imported here so the heavy OCR stack loads once per worker process
+    from main import process_document, save_json
+
+    entry = {"file": file_path, "status": "ok", "document_type": None, "output": None, "error": None}
+    start = time.perf_counter()
+    try:
+        with run(file_path):
+            document_type, output_data = process_document(file_path)
+            entry["document_type"] = document_type
+            entry["output"] = save_json(output_data, document_type, output_dir, f"{stem}_{document_type}.json")
+    except Exception as e:
+        log_error(f"[FR06] Batch processing failed for {file_path}: {str(e)}")
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {str(e)}"
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+def run_batch(files, output_dir="output", workers=1):
+    """Process files with a pool of workers and write manifest.json to output_dir."""
+    os.makedirs(output_dir, exist_ok=True)
+    started_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    start = time.perf_counter()
+    entries = []
+    base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in files]) if files else "."
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_file, path, output_dir, output_stem(os.path.abspath(path), base_dir)) for path in files]
+        for future in as_completed(futures):
+            entry = future.result()
+            entries.append(entry)
+            log_info(f"[Batch] {entry['status'].upper()} {entry['file']} ({entry['seconds']}s)")
+
+    entries.sort(key=lambda e: e["file"])
+    manifest = {
+        "started_at": started_at,
+        "workers": workers,
+        "total_seconds": round(time.perf_counter() - start, 3),
+        "processed": len(entries),
+        "succeeded": sum(e["status"] == "ok" for e in entries),
+        "failed": sum(e["status"] == "error" for e in entries),
+        "files": entries,
+    }
+    manifest_path = os.path.join(output_dir, "manifest.json")
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4, ensure_ascii=False)
+
+    log_info(f"[Batch] {manifest['succeeded']}/{manifest['processed']} documents processed, manifest: {manifest_path}")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract structured data from a directory or glob of documents")
+    parser.add_argument("target", help="Directory or glob pattern (quote globs so the shell does not expand them)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of documents processed concurrently")
+    parser.add_argument("--output-dir", default="output", help="Where per-document JSON and manifest.json are written")
+    parser.add_argument("--recursive", action="store_true", help="Include files in subdirectories")
+    args = parser.parse_args()
+
+    files = collect_files(args.target, args.recursive)
+    if not files:
+        log_error(f"[Batch] No PDF or image files found for: {args.target}")
+        raise SystemExit(1)
+
+    log_info(f"[Batch] Processing {len(files)} files with {args.workers} workers")
+    manifest = run_batch(files, args.output_dir, args.workers)
+    raise SystemExit(0 if manifest["failed"] == 0 else 2)
+
+
+if __name__ == "__main__":
+    main()
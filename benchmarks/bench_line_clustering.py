@@ -0,0 +1,81 @@
+# bench_line_clustering.py
+#
+# Compares extract_lines_with_boxes (WordBoxes.visual_lines: the original
+# first-match line rule, ported to sorted arrays and bisect) against the
+# original iterrows() implementation on the test_files invoices.
+# Run from the project root: python benchmarks/bench_line_clustering.py
+
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+from ocr_engine import convert_pdf_to_images, get_ocr_words
+from parser_invoice import extract_lines_with_boxes
+
+DEFAULT_INPUTS = ["test_files/*invoice*", "test_files/test/*invoice*"]
+
+
+def legacy_extract_lines_with_boxes(df):
+    """Original O(words x lines) implementation, kept as the reference."""
+    df = df.dropna(subset=["text"])
+    df = df[df["text"].astype(str).str.strip() != ""]
+    lines = defaultdict(list)
+
+    for _, row in df.iterrows():
+        y = row["top"]
+        text = row["text"]
+        line_id = y
+        for key in lines:
+            if abs(key - y) < 8:
+                line_id = key
+                break
+        lines[line_id].append((row["left"], text))
+
+    return ["  ".join(str(word) for _, word in sorted(words, key=lambda x: x[0])) for _, words in sorted(lines.items())]
+
+def load_first_page(path):
+    if path.lower().endswith(".pdf"):
+        return convert_pdf_to_images(path)[0]
+    return Image.open(path)
+
+def best_time(func, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark invoice word-to-line clustering")
+    parser.add_argument("inputs", nargs="*", default=DEFAULT_INPUTS, help="Files or glob patterns")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions per file (best is reported)")
+    args = parser.parse_args()
+
+    paths = sorted({p for pattern in args.inputs for p in glob.glob(pattern)})
+    if not paths:
+        print("No input files found.")
+        return
+
+    print(f"{'file':45} {'words':>6} {'legacy ms':>10} {'new ms':>8} {'speedup':>8} {'match':>6}")
+    for path in paths:
+        # OCR once; only the clustering step is timed
+        words = get_ocr_words(load_first_page(path))
+        df = words.to_dataframe()
+        word_count = int(words.has_text().sum())
+
+        legacy = best_time(legacy_extract_lines_with_boxes, df, args.repeat)
+        new = best_time(extract_lines_with_boxes, words, args.repeat)
+        match = legacy_extract_lines_with_boxes(df) == extract_lines_with_boxes(words)
+
+        print(f"{os.path.basename(path):45} {word_count:6d} {legacy * 1000:10.2f} {new * 1000:8.2f} {legacy / new:7.1f}x {str(match):>6}")
+
+
+if __name__ == "__main__":
+    main()
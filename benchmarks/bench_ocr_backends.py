@@ -0,0 +1,66 @@
+# bench_ocr_backends.py
+#
+# Compares OCR backends (pytesseract subprocess vs resident tesserocr engine)
+# on the test_files images. Run from the project root:
+#   python benchmarks/bench_ocr_backends.py --repeat 5
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from PIL import Image
+from ocr_backends import BACKENDS, get_ocr_backend
+from ocr_engine import OCR_LANG, OCR_CONFIG
+
+DEFAULT_INPUTS = ["test_files/*.png", "test_files/*.jpg", "test_files/test/*.png"]
+
+
+def time_calls(func, image, repeat):
+    func(image)  # Warm-up: first call pays engine start-up for resident backends
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(image)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR backends")
+    parser.add_argument("inputs", nargs="*", default=DEFAULT_INPUTS, help="Image files or glob patterns")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per image and backend (median is reported)")
+    parser.add_argument("--call", choices=["data", "string"], default="data", help="image_to_data or image_to_string")
+    args = parser.parse_args()
+
+    backends = []
+    for name in BACKENDS:
+        try:
+            backends.append(get_ocr_backend(name))
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+
+    paths = sorted({p for pattern in args.inputs for p in glob.glob(os.path.join(ROOT, pattern))})
+    print(f"{'file':36} " + " ".join(f"{b.name + ' ms':>16}" for b in backends))
+    totals = {b.name: 0.0 for b in backends}
+
+    for path in paths:
+        image = Image.open(path).convert("RGB")
+        row = []
+        for backend in backends:
+            call = backend.image_to_data if args.call == "data" else backend.image_to_string
+            median = time_calls(lambda img: call(img, OCR_LANG, OCR_CONFIG), image, args.repeat)
+            totals[backend.name] += median
+            row.append(f"{median * 1000:16.1f}")
+        print(f"{os.path.basename(path):36} " + " ".join(row))
+
+    print(f"{'total':36} " + " ".join(f"{totals[b.name] * 1000:16.1f}" for b in backends))
+    if "pytesseract" in totals and "tesserocr" in totals and totals["tesserocr"]:
+        print(f"tesserocr speedup: {totals['pytesseract'] / totals['tesserocr']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
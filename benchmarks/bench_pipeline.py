@@ -0,0 +1,242 @@
+# bench_pipeline.py
+#
+# Reproducible benchmark of the full pipeline and each stage over test_files/.
+# Run from the project root:
+#
+#   python benchmarks/bench_pipeline.py --record                 # OCR inputs once, save recordings
+#   python benchmarks/bench_pipeline.py --replay --repeat 50 --save-baseline benchmarks/baseline.json
+#   python benchmarks/bench_pipeline.py --replay --repeat 50 --compare benchmarks/baseline.json --threshold 0.15
+#
+# --replay feeds recorded OCR output to the pipeline so classification and
+# parser benchmarks run without Tesseract or Poppler installed. The recordings
+# and baseline in benchmarks/ are committed, so the comparison runs anywhere.
+
+import argparse
+import datetime
+import glob
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_INPUTS = ["test_files/*", "test_files/test/*"]
+RECORDINGS_DIR = os.path.join(ROOT, "benchmarks", "recordings")
+SUPPORTED_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg")
+
+
+def collect_inputs(patterns):
+    paths = {p for pattern in patterns for p in glob.glob(os.path.join(ROOT, pattern))}
+    return sorted(p for p in paths if p.lower().endswith(SUPPORTED_EXTENSIONS))
+
+def recording_path(path):
+    name = os.path.relpath(path, ROOT).replace(os.sep, "_").replace(".", "_")
+    return os.path.join(RECORDINGS_DIR, name + ".json")
+
+def ocr_document(path):
+    from ocr_engine import perform_ocr_on_pdf_with_data, perform_ocr_on_image_with_data
+    if path.lower().endswith(".pdf"):
+        return perform_ocr_on_pdf_with_data(path)
+    return perform_ocr_on_image_with_data(path)
+
+def record(paths):
+    from ocr_cache import page_to_dict
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    failed = 0
+    for path in paths:
+        try:
+            pages = ocr_document(path)
+        except Exception as e:
+            print(f"Could not record {os.path.relpath(path, ROOT)}: {type(e).__name__}: {str(e)}")
+            failed += 1
+            continue
+        with open(recording_path(path), "w", encoding="utf-8") as f:
+            json.dump({"source": os.path.relpath(path, ROOT), "pages": [page_to_dict(p) for p in pages]}, f, ensure_ascii=False)
+        print(f"Recorded {len(pages)} page(s): {os.path.relpath(path, ROOT)}")
+    return 1 if failed else 0
+
+def load_recording(path):
+    from ocr_cache import page_from_dict
+    with open(recording_path(path), "r", encoding="utf-8") as f:
+        return [page_from_dict(p) for p in json.load(f)["pages"]]
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(q * (len(values) - 1))))]
+
+def measure(func, repeat):
+    """Run func once under tracemalloc for peak memory, then repeat times for latency."""
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings, peak
+
+def summarize(samples, docs, pages):
+    """samples: list of (seconds per call, peak bytes) per document."""
+    latencies = [t for timings, _ in samples for t in timings]
+    total = sum(latencies)
+    runs = len(latencies) / max(docs, 1)
+    return {
+        "docs": docs,
+        "pages": pages,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p90_ms": round(_percentile(latencies, 0.90) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "docs_per_s": round(docs * runs / total, 2) if total else None,
+        "pages_per_s": round(pages * runs / total, 2) if total else None,
+        "peak_mem_mb": round(max(peak for _, peak in samples) / (1024 * 1024), 2),
+    }
+
+def run_benchmarks(paths, replay, repeat):
+    from doc_classifier import identify_document_type
+    from parser_invoice import parse_invoice, parse_transactions_layout_aware
+    from parser_receipt import parse_receipt
+    from parser_bank import parse_bank_statement
+    from parser_bank_layout import parse_bank_transactions_layout_aware  # Not the lazy wrapper: measure parsing, not its import
+    from ocr_engine import iter_pdf_pages, ocr_result_text
+    from main import process_document
+
+    parsers = {"invoice": parse_invoice, "receipt": parse_receipt, "bank_statement": parse_bank_statement}
+    samples = {}
+    counts = {}
+
+    def add(stage_name, func, pages):
+        samples.setdefault(stage_name, []).append(measure(func, repeat))
+        docs, total_pages = counts.get(stage_name, (0, 0))
+        counts[stage_name] = (docs + 1, total_pages + pages)
+
+    for path in paths:
+        if replay:
+            if not os.path.exists(recording_path(path)):
+                print(f"Skipping (no recording): {os.path.relpath(path, ROOT)}")
+                continue
+            ocr_pages = load_recording(path)
+        else:
+            ocr_pages = ocr_document(path)
+            if path.lower().endswith(".pdf"):
+                add("rasterize", lambda: list(iter_pdf_pages(path)), len(ocr_pages))
+            add("ocr", lambda: ocr_document(path), len(ocr_pages))
+
+        page_count = len(ocr_pages)
+        text = ocr_result_text(ocr_pages)
+        document_type = identify_document_type(text)
+
+        add("classify", lambda: identify_document_type(text), page_count)
+        if document_type in parsers:
+            add(f"parse_{document_type}", lambda: parsers[document_type](text), page_count)
+        if document_type == "invoice" and ocr_pages:
+            add("layout_invoice", lambda: parse_transactions_layout_aware(path, ocr_pages=ocr_pages), 1)
+        if document_type == "bank_statement" and ocr_pages:
+            add("layout_bank_statement", lambda: parse_bank_transactions_layout_aware(ocr_pages), page_count)
+        add("pipeline", lambda: process_document(path, ocr_pages=ocr_pages if replay else None), page_count)
+
+    return {name: summarize(samples[name], *counts[name]) for name in samples}
+
+def compare(baseline, current, threshold, min_delta_ms=0.0):
+    """
+    Return (stage, metric, baseline, current) for every metric that regressed past
+    threshold (latencies also by more than min_delta_ms, so sub-millisecond stages
+    do not fail on timer noise), plus (stage, "docs", baseline docs, current docs) for every baseline
+    stage the current run did not measure on as many documents (missing recordings,
+    a stage that stopped running, ...): a check that measured nothing must fail.
+    """
+    regressions = []
+    for stage_name, base in baseline["stages"].items():
+        result = current["stages"].get(stage_name)
+        docs = result["docs"] if result else 0
+        if docs < base["docs"]:
+            regressions.append((stage_name, "docs", base["docs"], docs))
+            continue
+        for metric in ("p50_ms", "p90_ms", "peak_mem_mb"):
+            if metric.endswith("_ms") and result[metric] - base[metric] <= min_delta_ms:
+                continue
+            if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                regressions.append((stage_name, metric, base[metric], result[metric]))
+    return regressions
+
+def print_table(stages):
+    print(f"{'stage':22} {'docs':>5} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'docs/s':>8} {'pages/s':>8} {'peak MB':>8}")
+    for name, r in stages.items():
+        print(f"{name:22} {r['docs']:5d} {r['p50_ms']:9.2f} {r['p90_ms']:9.2f} {r['p99_ms']:9.2f} "
+              f"{r['docs_per_s'] or 0:8.2f} {r['pages_per_s'] or 0:8.2f} {r['peak_mem_mb']:8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the extraction pipeline over test_files")
+    parser.add_argument("inputs", nargs="*", default=DEFAULT_INPUTS, help="Glob patterns relative to the project root")
+    parser.add_argument("--record", action="store_true", help="OCR every input and save recordings, then exit")
+    parser.add_argument("--replay", action="store_true", help="Use recorded OCR output instead of Tesseract")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per document and stage")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative slowdown before flagging (0.15 = 15%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Latency increases up to this many ms are never flagged")
+    args = parser.parse_args()
+
+    # Measure the code, not the OCR cache or the timing log
+    os.environ.setdefault("OCR_CACHE", "0")
+    os.environ.setdefault("INSTRUMENTATION", "0")
+    os.chdir(ROOT)
+    from logger import configure_logging
+    configure_logging()  # Configure first so the level below sticks
+    logging.getLogger().setLevel(logging.WARNING)
+
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        print("No input files found.")
+        return 1
+
+    if args.record:
+        return record(paths)
+
+    results = {
+        "created": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "mode": "replay" if args.replay else "live",
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stages": run_benchmarks(paths, args.replay, args.repeat),
+    }
+    if not results["stages"]:
+        print("No documents were benchmarked" + (" (record them first with --record)" if args.replay else ""))
+        return 1
+    print_table(results["stages"])
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("mode") != results["mode"]:
+            print(f"Warning: baseline mode '{baseline.get('mode')}' differs from current mode '{results['mode']}'")
+        if not baseline.get("stages"):
+            print(f"Baseline {args.compare} has no stages: nothing to compare against")
+            return 1
+        regressions = compare(baseline, results, args.threshold, args.min_delta_ms)
+        for stage_name, metric, before, after in regressions:
+            if metric == "docs":
+                print(f"MISSING {stage_name}: measured on {after} of {before} baseline documents")
+            else:
+                print(f"REGRESSION {stage_name} {metric}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
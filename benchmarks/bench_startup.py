@@ -0,0 +1,115 @@
+# bench_startup.py
+#
+# Cold-start cost of the entry points: each module is imported in a fresh
+# interpreter under -X importtime. Run from the project root:
+#
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --save benchmarks/startup_profile.json
+#   python benchmarks/bench_startup.py --compare benchmarks/startup_profile.json --threshold 0.25
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["main", "batch", "service", "ocr_engine", "parser_invoice", "parser_receipt", "parser_bank"]
+
+
+def import_profile(module):
+    """Import module in a fresh interpreter; returns {package: self time in us} from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+    return packages
+
+def measure(module, repeat, top):
+    totals = []
+    packages = None
+    for _ in range(repeat):
+        profile = import_profile(module)
+        totals.append(sum(profile.values()))
+        if packages is None or totals[-1] <= min(totals):
+            packages = profile
+
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "median_ms": round(statistics.median(totals) / 1000, 1),
+        "min_ms": round(min(totals) / 1000, 1),
+        "packages": len(packages),
+        "heaviest_ms": {name: round(us / 1000, 1) for name, us in heaviest},
+    }
+
+def compare(baseline, current, threshold):
+    """Return (module, baseline ms, current ms) for every entry point that got slower than threshold."""
+    regressions = []
+    for module, result in current["imports"].items():
+        base = baseline["imports"].get(module)
+        if base and result["median_ms"] > base["median_ms"] * (1 + threshold):
+            regressions.append((module, base["median_ms"], result["median_ms"]))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import time of the entry points")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module (median is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages listed per module")
+    parser.add_argument("--save", metavar="PATH", help="Write the import-time profile as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a saved profile")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown before flagging (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    imports = {}
+    print(f"{'module':16} {'median ms':>10} {'min ms':>8}  heaviest packages (ms)")
+    for module in args.modules:
+        try:
+            result = imports[module] = measure(module, args.repeat, args.top)
+        except RuntimeError as e:
+            print(f"{module:16} skipped: {e}")
+            continue
+        heaviest = ", ".join(f"{name} {ms:.0f}" for name, ms in result["heaviest_ms"].items())
+        print(f"{module:16} {result['median_ms']:10.1f} {result['min_ms']:8.1f}  {heaviest}")
+
+    profile = {
+        "created": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "repeat": args.repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "imports": imports,
+    }
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(profile, f, indent=4)
+        print(f"Profile saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, profile, args.threshold)
+        for module, before, after in regressions:
+            print(f"REGRESSION import {module}: {before} ms -> {after} ms (+{(after / before - 1) * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,228 @@
 # doc_classifier.py
 
+import json
+import os
+import re
+from instrumentation import timed
+from logger import log_debug, log_info
+
+# --- Keyword Tables (edit as needed) ---
+# Strong indicators, in priority order: (document type, anchor, confirming keywords).
+# The anchor plus any one confirming keyword classifies the document outright.
+STRONG_INDICATORS = [
+    ("receipt", "receipt", ("payment method", "transaction id", "provider info", "date of receipt")),
+    ("invoice", "invoice", ("invoice no", "facture", "client info", "date of invoice")),
+    ("bank_statement", "bank statement", ("rib", "solde", "bank name", "account number", "statement of account", "releve bancaire")),
+]
+
+# Secondary keyword groups: one point per keyword found, highest score wins
+# (ties go to the type listed first)
+KEYWORD_GROUPS = {
+    "invoice": ("invoice", "facture", "invoice no", "vat", "tva",
+                "total ttc", "pro forma invoice", "subtotal", "freight", "tax rate"),
+    "receipt": ("cash", "amount paid", "till", "credit card", "customer copy"),
+    "bank_statement": ("date valeur", "date operation", "credit", "debit"),
+}
+
+# JSON file replacing the tables above: {"strong_indicators": [[type, anchor, [keywords]], ...],
+# "keyword_groups": {type: [keywords]}}; a section missing from the file keeps its default
+DOC_KEYWORDS_FILE = os.environ.get("DOC_KEYWORDS_FILE", "")
+
+# Optional trained model (doc_model.py), used first when the file exists; texts it
+# is less than DOC_MODEL_MIN_CONFIDENCE sure about go to the keyword rules
+DOC_MODEL_FILE = os.environ.get("DOC_MODEL_FILE", os.path.join("models", "doc_model.npz"))
+DOC_MODEL_MIN_CONFIDENCE = float(os.environ.get("DOC_MODEL_MIN_CONFIDENCE", "0.6"))
+
+
+def load_keyword_tables(path=None):
+    """Return (strong_indicators, keyword_groups), read from path when given."""
+    if not path:
+        return STRONG_INDICATORS, KEYWORD_GROUPS
+    with open(path, "r", encoding="utf-8") as f:
+        tables = json.load(f)
+    strong = [(doc_type, anchor, tuple(keywords)) for doc_type, anchor, keywords in tables.get("strong_indicators", STRONG_INDICATORS)]
+    groups = {doc_type: tuple(keywords) for doc_type, keywords in tables.get("keyword_groups", KEYWORD_GROUPS).items()}
+    return strong, groups
+
+def _trie_pattern(keywords):
+    """Regex alternation of keywords factored by common prefix: c(?:ash|redit(?: card)?|...)."""
+    trie = {}
+    for kw in keywords:
+        node = trie
+        for char in kw:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:  # A keyword ends here: the longer continuations are optional
+            pattern = f"(?:{pattern})?"
+        return pattern
+
+    return build(trie)
+
+def _compile_scanner(keywords):
+    """
+    One regex for all keywords (lowercase text). Each search stops at the next
+    position where some keyword starts and matches the longest one there.
+    """
+    return re.compile(_trie_pattern(keywords))
+
+
+class KeywordClassifier:
+    """
+    Keyword rules compiled into a single-pass matcher (a prefix trie as one
+    regex, Aho-Corasick style). The lowercased text is scanned once;
+    every keyword found also counts the keywords it contains ("invoice no" ->
+    "invoice"), so the result is the same as testing each keyword with `in`.
+    Once a strong indicator fires, only the keywords of higher-priority strong
+    indicators are still looked for, and the scan ends when none are left.
+    """
+
+    def __init__(self, strong_indicators=None, keyword_groups=None):
+        if strong_indicators is None and keyword_groups is None:
+            strong_indicators, keyword_groups = load_keyword_tables(DOC_KEYWORDS_FILE)
+        self.strong = [(doc_type, anchor.lower(), frozenset(kw.lower() for kw in keywords))
+                       for doc_type, anchor, keywords in strong_indicators or []]
+        self.groups = {doc_type: frozenset(kw.lower() for kw in keywords) for doc_type, keywords in (keyword_groups or {}).items()}
+
+        rule_keywords = [{anchor} | keywords for _, anchor, keywords in self.strong]
+        all_keywords = set().union(*rule_keywords, *self.groups.values())
+        self.contains = {kw: frozenset(other for other in all_keywords if other in kw) for kw in all_keywords}
+        self.rules_by_keyword = {}
+        for index, keywords in enumerate(rule_keywords):
+            for kw in keywords:
+                self.rules_by_keyword.setdefault(kw, []).append(index)
+
+        # scanners[i]: keywords of the strong indicators ranked above i (None for the top one)
+        self.scanner = _compile_scanner(all_keywords) if all_keywords else None
+        self.scanners = [_compile_scanner(set().union(*rule_keywords[:i])) if i else None for i in range(len(self.strong))]
+
+    def _fired_rule(self, new, hits, limit):
+        """Highest-priority strong indicator above limit completed by the new keywords, or None."""
+        candidates = {index for kw in new for index in self.rules_by_keyword.get(kw, ()) if limit is None or index < limit}
+        for index in sorted(candidates):
+            _, anchor, keywords = self.strong[index]
+            if anchor in hits and not hits.isdisjoint(keywords):
+                return index
+        return None
+
+    def scan(self, text):
+        """Return (index of the strong indicator that fired or None, set of keywords found)."""
+        text = text.lower()
+        hits = set()
+        fired = None
+        scanner = self.scanner
+        pos = 0
+        while scanner is not None:
+            match = scanner.search(text, pos)
+            if match is None:
+                break
+            pos = match.start() + 1  # Next search may start inside this keyword (overlaps)
+            keyword = match.group()
+            if keyword in hits:
+                continue
+            new = self.contains[keyword] - hits
+            hits |= new
+            rule = self._fired_rule(new, hits, fired)
+            if rule is not None:
+                fired = rule
+                scanner = self.scanners[rule]
+        return fired, hits
+
+    def scores(self, hits):
+        return {doc_type: len(keywords & hits) for doc_type, keywords in self.groups.items()}
+
+    def predict(self, text):
+        """
+        Return (document type, confidence from 0 to 1). A strong indicator gives 1.0;
+        keyword scores give the winner's lead over the runner-up, (best - second) / (best + 1),
+        so one lone keyword is 0.5 and a tie is 0.
+        """
+        fired, hits = self.scan(text)
+        if fired is not None:
+            doc_type, anchor, keywords = self.strong[fired]
+            log_debug(f"[Classifier] Strong indicator '{anchor}' + {sorted(keywords & hits)} → {doc_type}")
+            return doc_type, 1.0
+
+        score = self.scores(hits)
+        best_match = max(score, key=score.get) if score else None
+        if best_match and score[best_match] > 0:
+            best, second = (sorted(score.values(), reverse=True) + [0])[:2]
+            confidence = round((best - second) / (best + 1), 2)
+            log_debug(f"[Classifier] Keyword scores {score} → {best_match} ({confidence})")
+            return best_match, confidence
+
+        log_debug("[Classifier] No keyword match → unknown")
+        return "unknown", 0.0
+
+    def predict_batch(self, texts):
+        return [self.predict(text) for text in texts]
+
+    def classify(self, text):
+        return self.predict(text)[0]
+
+
+class ModelClassifier:
+    """Trained doc_model.HashedNgramModel first, keyword rules for what it is unsure about."""
+
+    def __init__(self, model, fallback, min_confidence=None):
+        self.model = model
+        self.fallback = fallback
+        self.min_confidence = DOC_MODEL_MIN_CONFIDENCE if min_confidence is None else min_confidence
+
+    def predict_batch(self, texts):
+        """One vectorized model pass for the whole batch."""
+        results = []
+        for text, (doc_type, confidence) in zip(texts, self.model.predict(texts)):
+            if confidence >= self.min_confidence:
+                log_debug(f"[Classifier] Model → {doc_type} ({confidence})")
+                results.append((doc_type, confidence))
+            else:
+                log_debug(f"[Classifier] Model unsure ({doc_type}, {confidence}) → keyword rules")
+                results.append(self.fallback.predict(text))
+        return results
+
+    def predict(self, text):
+        return self.predict_batch([text])[0]
+
+    def classify(self, text):
+        return self.predict(text)[0]
+
+
+def load_classifier(model_file=None):
+    """Keyword rules, behind the trained model when model_file (default DOC_MODEL_FILE) exists."""
+    model_file = DOC_MODEL_FILE if model_file is None else model_file
+    keywords = KeywordClassifier()
+    if not model_file or not os.path.exists(model_file):
+        return keywords
+    from doc_model import HashedNgramModel
+    model = HashedNgramModel.load(model_file)
+    log_info(f"Document classifier model loaded from {model_file} ({', '.join(model.labels)})")
+    return ModelClassifier(model, keywords)
+
+
+# Classifier used by identify_document_type; replace it to plug in other rules
+classifier = load_classifier()
+
+
+@timed()
 def identify_document_type(text):
     """
     Identify document type: invoice, receipt, or bank_statement.
-    Uses strong keyword logic and debugging tips.
+    Strong indicators decide first, then the secondary keyword scores.
     """
-    text_lower = text.lower()
-
-    # --- Strong Indicators ---
-    if "receipt" in text_lower and ("payment method" in text_lower or "transaction id" in text_lower or "provider info" in text_lower or "date of receipt" in text_lower):
-        print("[Debug] Detected keywords: 'receipt' + 'payment method' or 'transaction id' → Classified as RECEIPT")
-        return "receipt"
-
-    if "invoice" in text_lower and ("invoice no" in text_lower or "facture" in text_lower or "client info" in text_lower or "date of invoice" in text_lower):
-        print("[Debug] Detected keywords: 'invoice', 'invoice no', or 'facture' → Classified as INVOICE")
-        return "invoice"
-
-    if "bank statement" in text_lower and ("rib" in text_lower or "solde" in text_lower or "bank name" in text_lower or "account number" in text_lower or "statement of account" in text_lower or "releve bancaire" in text_lower):
-        print("[Debug] Detected keywords: 'releve bancaire', 'rib', or 'solde' → Classified as BANK STATEMENT")
-        return "bank_statement"
-
-    # --- Secondary Keyword Groups ---
-    invoice_keywords = [
-        "invoice", "facture", "invoice no", "vat", "tva",
-        "total ttc", "pro forma invoice", "subtotal", "freight", "tax rate"
-    ]
-    receipt_keywords = ["cash", "amount paid", "till", "credit card", "customer copy"]
-    bank_keywords = ["date valeur", "date operation", "credit", "debit"]
-
-    # --- Keyword Scoring ---
-    score = {
-        "invoice": sum(k in text_lower for k in invoice_keywords),
-        "receipt": sum(k in text_lower for k in receipt_keywords),
-        "bank_statement": sum(k in text_lower for k in bank_keywords),
-    }
-
-    # Get highest scoring type
-    best_match = max(score, key=score.get)
-
-    if score[best_match] > 0:
-        print(f"[Debug] Keyword score → Invoice: {score['invoice']}, Receipt: {score['receipt']}, Bank: {score['bank_statement']} → Chose: {best_match.upper()}")
-        return best_match
-
-    # Fallback
-    print("[Debug] No strong match found → Classified as UNKNOWN")
-    return "unknown"
+    return classifier.classify(text)
+
+@timed()
+def identify_document_types(texts):
+    """Batch form of identify_document_type (a trained model scores all texts at once)."""
+    return [doc_type for doc_type, _ in classifier.predict_batch(texts)]
+
+@timed()
+def classify_with_confidence(text):
+    """(document type, confidence) for text; see KeywordClassifier.predict."""
+    return classifier.predict(text)
@@ -0,0 +1,203 @@
+# doc_model.py
+#
+# Optional trained document-type classifier: hashed word unigrams and bigrams
+# with a softmax linear model, numpy only. Train it from labeled output JSONs
+# (document_type + metadata.source_file) and the documents they came from:
+#
+#   python doc_model.py "output/*.json" --docs incoming test_files --save models/doc_model.npz
+#
+# doc_classifier uses the saved model when DOC_MODEL_FILE exists.
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import zlib
+from functools import lru_cache
+import numpy as np
+
+# Model settings (edit as needed)
+N_FEATURES = 2 ** 18            # Hash buckets shared by unigrams and bigrams
+TRAIN_EPOCHS = 300
+TRAIN_LEARNING_RATE = 2.0       # Feature vectors are L2-normalized
+TRAIN_L2 = 1e-4
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{2,}")   # Words of 2+ letters (accents included); amounts and IDs are noise
+BIGRAM_MULTIPLIER = np.uint64(1000003)
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_hash(token):
+    """Stable across processes (unlike hash()), so saved models stay valid."""
+    return zlib.crc32(token.encode("utf-8"))
+
+def hash_features(text, n_features=N_FEATURES):
+    """Return (feature columns, values): log counts of hashed unigrams and bigrams, L2-normalized."""
+    hashes = np.fromiter(map(_token_hash, TOKEN_PATTERN.findall(text.lower())), dtype=np.uint64)
+    bigrams = hashes[:-1] * BIGRAM_MULTIPLIER ^ hashes[1:]
+    columns, counts = np.unique(np.concatenate([hashes, bigrams]) % np.uint64(n_features), return_counts=True)
+    values = np.log1p(counts)
+    norm = np.linalg.norm(values)
+    return columns.astype(np.int64), values / norm if norm else values
+
+def featurize(texts, n_features=N_FEATURES):
+    """Sparse batch matrix as (rows, columns, values) arrays, one row per text."""
+    rows, columns, values = [], [], []
+    for row, text in enumerate(texts):
+        cols, vals = hash_features(text, n_features)
+        rows.append(np.full(len(cols), row))
+        columns.append(cols)
+        values.append(vals)
+    if not texts:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0)
+    return np.concatenate(rows), np.concatenate(columns), np.concatenate(values)
+
+def _scores(rows, columns, values, weights, bias, n_rows):
+    """X @ weights + bias for the sparse batch, one bincount per class."""
+    contributions = weights[columns] * values[:, None]
+    scores = np.empty((n_rows, weights.shape[1]))
+    for j in range(weights.shape[1]):
+        scores[:, j] = np.bincount(rows, weights=contributions[:, j], minlength=n_rows)
+    return scores + bias
+
+def _softmax(scores):
+    exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class HashedNgramModel:
+    """Linear softmax classifier over hashed n-grams; predict() works on whole batches."""
+
+    def __init__(self, labels, weights, bias, n_features=N_FEATURES):
+        self.labels = list(labels)
+        self.weights = weights      # (n_features, n_labels)
+        self.bias = bias            # (n_labels,)
+        self.n_features = n_features
+
+    @classmethod
+    def fit(cls, texts, labels, n_features=N_FEATURES, epochs=TRAIN_EPOCHS, learning_rate=TRAIN_LEARNING_RATE, l2=TRAIN_L2):
+        """Full-batch gradient descent on the cross-entropy, over the feature columns the texts use."""
+        classes = sorted(set(labels))
+        targets = np.zeros((len(texts), len(classes)))
+        targets[np.arange(len(texts)), [classes.index(label) for label in labels]] = 1
+
+        rows, columns, values = featurize(texts, n_features)
+        used, compact = np.unique(columns, return_inverse=True)
+        weights = np.zeros((len(used), len(classes)))
+        bias = np.zeros(len(classes))
+
+        for _ in range(epochs):
+            probabilities = _softmax(_scores(rows, compact, values, weights, bias, len(texts)))
+            error = (probabilities - targets) / len(texts)
+            gradient = np.empty_like(weights)
+            for j in range(len(classes)):
+                gradient[:, j] = np.bincount(compact, weights=values * error[rows, j], minlength=len(used))
+            weights -= learning_rate * (gradient + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+        full = np.zeros((n_features, len(classes)))
+        full[used] = weights
+        return cls(classes, full, bias, n_features)
+
+    def predict_proba(self, texts):
+        """Class probabilities, plus per text the number of its features the model has weights for."""
+        rows, columns, values = featurize(texts, self.n_features)
+        known = np.bincount(rows, weights=self.weights[columns].any(axis=1), minlength=len(texts))
+        return _softmax(_scores(rows, columns, values, self.weights, self.bias, len(texts))), known
+
+    def predict(self, texts):
+        """
+        Return [(label, probability)] for a batch of texts. A text without a
+        single feature seen in training gets probability 0: its prediction would
+        be the class prior alone.
+        """
+        if not texts:
+            return []
+        probabilities, known = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[i], round(float(p[i]), 2) if k else 0.0) for i, p, k in zip(best, probabilities, known)]
+
+    def save(self, path):
+        """Store only the hash buckets with non-zero weights."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        used = np.flatnonzero(self.weights.any(axis=1))
+        np.savez_compressed(path, labels=np.array(self.labels), n_features=self.n_features,
+                            columns=used, weights=self.weights[used].astype(np.float32), bias=self.bias)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n_features = int(data["n_features"])
+            weights = np.zeros((n_features, len(data["labels"])))
+            weights[data["columns"]] = data["weights"]
+            return cls([str(label) for label in data["labels"]], weights, data["bias"], n_features)
+
+
+# --- Training from output JSONs ---
+
+def find_source(source_file, doc_dirs):
+    for doc_dir in doc_dirs:
+        path = os.path.join(doc_dir, source_file)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def load_training_set(patterns, doc_dirs):
+    """
+    Pair each output JSON's document_type with the document named in its
+    metadata.source_file (looked up in doc_dirs). Returns {document path: label};
+    documents are OCRed by the caller.
+    """
+    from logger import log_warning
+    labeled = {}
+    for pattern in patterns:
+        for output_path in sorted(glob.glob(pattern)):
+            with open(output_path, "r", encoding="utf-8") as f:
+                output = json.load(f)
+            label = output.get("document_type")
+            source_file = output.get("metadata", {}).get("source_file")
+            path = find_source(source_file, doc_dirs) if label and source_file else None
+            if path is None:
+                log_warning(f"Skipping {output_path}: source document {source_file!r} not found")
+                continue
+            if labeled.get(path, label) != label:
+                log_warning(f"Conflicting labels for {path}: {labeled[path]} and {label} ({output_path}); keeping {label}")
+            labeled[path] = label
+    return labeled
+
+def document_text(path):
+    """OCR text of a document; the OCR cache makes retraining cheap."""
+    from doc_source import is_pdf
+    from ocr_engine import perform_ocr_on_pdf_with_data, perform_ocr_on_image_with_data, ocr_result_text
+    pages = perform_ocr_on_pdf_with_data(path) if is_pdf(path) else perform_ocr_on_image_with_data(path)
+    return ocr_result_text(pages)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the hashed n-gram document-type classifier")
+    parser.add_argument("outputs", nargs="+", help="Output JSON files or glob patterns (labels)")
+    parser.add_argument("--docs", nargs="+", default=["."], help="Directories holding the source documents")
+    parser.add_argument("--save", default=os.path.join("models", "doc_model.npz"), help="Model file to write")
+    parser.add_argument("--epochs", type=int, default=TRAIN_EPOCHS)
+    args = parser.parse_args()
+
+    labeled = load_training_set(args.outputs, args.docs)
+    if len(set(labeled.values())) < 2:
+        print("Need labeled documents of at least two types to train")
+        return 1
+
+    texts = [document_text(path) for path in labeled]
+    labels = list(labeled.values())
+    model = HashedNgramModel.fit(texts, labels, epochs=args.epochs)
+    predicted = [label for label, _ in model.predict(texts)]
+    accuracy = sum(p == label for p, label in zip(predicted, labels)) / len(labels)
+
+    model.save(args.save)
+    counts = {label: labels.count(label) for label in model.labels}
+    print(f"Trained on {len(labels)} documents {counts}, training accuracy {accuracy:.0%}; model saved to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
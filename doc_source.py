@@ -0,0 +1,44 @@
+# doc_source.py
+#
+# Documents can be passed to the pipeline as a file path, as bytes, or as a
+# binary file-like object (e.g. a Streamlit upload or io.BytesIO).
+
+import io
+import os
+
+PDF_MAGIC = b"%PDF-"
+
+
+def load_source(source):
+    """Paths stay paths (str); bytes-like and file-like input is read into bytes once."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "read"):
+        if hasattr(source, "getvalue"):
+            return source.getvalue()  # BytesIO-like: whole buffer, whatever the position
+        return source.read()
+    raise TypeError(f"Unsupported document source: {type(source).__name__}")
+
+def is_path(source):
+    return isinstance(source, str)
+
+def source_name(source, name=None):
+    """Name for logs and output metadata."""
+    if name:
+        return name
+    return source if is_path(source) else "<memory>"
+
+def is_pdf(source, name=None):
+    """PDF by file extension for paths (and named uploads), by header for bytes."""
+    if is_path(source):
+        return source.lower().endswith(".pdf")
+    if name:
+        return name.lower().endswith(".pdf")
+    return PDF_MAGIC in source[:1024]
+
+def open_image(source):
+    """Decode an image from a path or from bytes, without touching the disk for bytes."""
+    from PIL import Image
+    return Image.open(source if is_path(source) else io.BytesIO(source))
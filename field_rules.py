@@ -0,0 +1,127 @@
+# field_rules.py
+
+import re
+import time
+
+# --- Rule Tables: (field, keywords, pattern, group) per document type ---
+# keywords lists the literal words every match of the pattern starts with
+# (case-insensitive); None means the rule has no leading keyword and is
+# searched on its own.
+INVOICE_RULES = [
+    ("invoice_number", ("facture", "invoice"), r"(facture|invoice)\s*(n°|no|numéro)?\s*[:\-]?\s*([A-Za-z0-9\/\-]+)", 3),
+    ("invoice_date", ("date", "casablanca"), r"(date\s*facture|casablanca le|date)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", 2),
+    ("delivery_date", ("livraison", "delivery"), r"(livraison\s*le|delivery\s*date)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", 2),
+    ("due_date", ("echeance", "due"), r"(echeance|due\s*date)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", 2),
+    ("client_name", ("client",), r"client\s*[:\-]?\s*([A-Z0-9\s\-]+)", 1),
+    ("client_ice_or_if", ("ice", "if"), r"(ice|if)\s*(client)?\s*[:\-]?\s*(\d+)", 3),
+    ("provider_name", ("fourni", "issuer", "from"), r"(fourni\w*|issuer|from)\s*[:\-]?\s*([A-Z][a-zA-Z\s&]+)", 2),
+    ("provider_ice_or_if", ("ice", "if"), r"(ice|if)\s*(fournisseur|provider)?\s*[:\-]?\s*(\d+)", 3),
+    ("sub_total_ht", ("sous", "sub"), r"(sous\s*total\s*ht|sub\s*total)\s*[:\-]?\s*([\d\., ]+)", 2),
+    ("vat_amount", ("montant", "vat"), r"(montant\s*tva|vat\s*amount)\s*[:\-]?\s*([\d\., ]+)", 2),
+    ("vat_percent", ("tva",), r"tva\s*[:\-]?\s*(\d{1,2})\s*%", 1),
+    ("total_ttc", ("total",), r"(total\s*ttc|total\s*amount)\s*[:\-]?\s*([\d\., ]+)", 2),
+    ("discount", ("remise", "discount"), r"(remise|discount)\s*[:\-]?\s*([\d\.,]+)", 2),
+    ("delivery_fee", ("livraison", "delivery"), r"(livraison|delivery\s*fee)\s*[:\-]?\s*([\d\.,]+)", 2),
+    ("other_charges", ("frais", "other"), r"(frais divers|other charges)\s*[:\-]?\s*([\d\.,]+)", 2),
+]
+
+RECEIPT_RULES = [
+    ("receipt_number", ("receipt", "ticket", "invoice"), r"(receipt|ticket|invoice)\s*#?[:\-]?\s*([A-Za-z0-9\-/]+)", 2),
+    ("date", ("date",), r"(date)\s*[:\-]?\s*(\d{1,2}[\/\.\-]\d{1,2}[\/\.\-]\d{2,4})", 2),
+    ("time", ("time",), r"(time)\s*[:\-]?\s*(\d{1,2}:\d{2}(?:\s*[APMapm]{2})?)", 2),
+    ("shop_name", None, r"^(.*(?:store|mart|shop|restaurant|bakery|pharmacy))", 1),
+    ("address", ("address",), r"(address)\s*[:\-]?\s*(.+?)(?=\s{2,}|date|time|phone|$)", 2),
+    ("total_amount_paid", ("total", "grand"), r"(total\s*(amount)?\s*(paid)?|grand\s*total)\s*[:\-]?\s*([0-9.,]+)", 4),
+    ("payment_method", ("payment", "paid"), r"(payment\s*method|paid\s*by)\s*[:\-]?\s*(cash|card|credit|debit)", 2),
+]
+
+BANK_RULES = [
+    ("statement_date", ("statement",), r"(statement\s*date)\s*[:\-]?\s*(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})", 2),
+    ("period_covered", ("period", "date"), r"(period\s*covered|date\s*range)\s*[:\-]?\s*(.+?)(?=\n|$)", 2),
+    ("opening_balance", ("opening",), r"(opening\s*balance)\s*[:\-]?\s*([0-9.,\-]+)", 2),
+    ("closing_balance", ("closing",), r"(closing\s*balance)\s*[:\-]?\s*([0-9.,\-]+)", 2),
+    ("currency", ("currency",), r"(currency)\s*[:\-]?\s*([A-Z]{3})", 2),
+    ("account_number", ("account", "iban"), r"(account\s*number|iban)\s*[:\-]?\s*([A-Z0-9\- ]{5,})", 2),
+    ("account_holder", ("account", "client"), r"(account\s*holder|client\s*name)\s*[:\-]?\s*(.+)", 2),
+]
+
+# Per-rule timing: {(document_type, field): [match attempts, hits, seconds]}
+rule_timings = {}
+
+
+def compile_rules(document_type, rules, flags):
+    """
+    Compile a rule table once: one regex per field plus a combined keyword scanner.
+    The scanner is a zero-width alternation of every leading keyword, so a single
+    pass over the text stops only at positions where some field can start.
+    """
+    compiled = [(field, re.compile(pattern, flags), group, keywords is not None) for field, keywords, pattern, group in rules]
+    keywords = sorted({kw for _, kws, _, _ in rules if kws for kw in kws}, key=len, reverse=True)
+    first_chars = "".join(sorted({kw[0].lower() for kw in keywords}))
+    scanner = re.compile(f"(?=[{re.escape(first_chars)}])(?=" + "|".join(map(re.escape, keywords)) + ")", flags)
+    return {"document_type": document_type, "rules": compiled, "scanner": scanner}
+
+INVOICE_RULESET = compile_rules("invoice", INVOICE_RULES, re.IGNORECASE)
+RECEIPT_RULESET = compile_rules("receipt", RECEIPT_RULES, re.IGNORECASE | re.MULTILINE)
+BANK_RULESET = compile_rules("bank_statement", BANK_RULES, re.IGNORECASE | re.MULTILINE)
+
+
+def _timed_match(document_type, field, regex, text, pos=None):
+    start = time.perf_counter()
+    match = regex.search(text) if pos is None else regex.match(text, pos)
+    timing = rule_timings.setdefault((document_type, field), [0, 0, 0.0])
+    timing[0] += 1
+    timing[1] += 1 if match else 0
+    timing[2] += time.perf_counter() - start
+    return match
+
+def extract_fields(ruleset, text, fallback="N/A"):
+    """
+    Evaluate every rule of a compiled ruleset in one pass over text.
+    Each field gets the same value as re.search(pattern, text) would give:
+    at every position the scanner stops on, the still-unresolved rules are
+    tried with pattern.match, so the first position a rule matches wins.
+    """
+    document_type = ruleset["document_type"]
+    results = {}
+    pending = []
+
+    scan_start = time.perf_counter()
+    for field, regex, group, has_keywords in ruleset["rules"]:
+        if has_keywords:
+            pending.append((field, regex, group))
+            continue
+        match = _timed_match(document_type, field, regex, text)
+        if match:
+            results[field] = match.group(group).strip()
+
+    for hit in ruleset["scanner"].finditer(text):
+        if not pending:
+            break
+        pos = hit.start()
+        still_pending = []
+        for field, regex, group in pending:
+            match = _timed_match(document_type, field, regex, text, pos)
+            if match:
+                results[field] = match.group(group).strip()
+            else:
+                still_pending.append((field, regex, group))
+        pending = still_pending
+
+    scan_timing = rule_timings.setdefault((document_type, "(scan)"), [0, 0, 0.0])
+    scan_timing[0] += 1
+    scan_timing[2] += time.perf_counter() - scan_start
+
+    return {field: results.get(field, fallback) for field, _, _, _ in ruleset["rules"]}
+
+def get_rule_timings():
+    """Per-rule timing summary, slowest first. The "(scan)" row is the whole pass per document."""
+    summary = [
+        {"document_type": document_type, "field": field, "attempts": attempts, "hits": hits,
+         "total_ms": round(seconds * 1000, 3)}
+        for (document_type, field), (attempts, hits, seconds) in rule_timings.items()
+    ]
+    return sorted(summary, key=lambda row: row["total_ms"], reverse=True)
+
+def reset_rule_timings():
+    rule_timings.clear()
@@ -0,0 +1,161 @@
+# instrumentation.py
+
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+from logger import log_info, log_record
+
+# Instrumentation settings (edit as needed)
+INSTRUMENTATION_ENABLED = os.environ.get("INSTRUMENTATION", "1") != "0"
+ROLLING_WINDOW = int(os.environ.get("INSTRUMENTATION_WINDOW", "500"))  # Samples kept per stage for percentiles
+ROLLING_LOG_EVERY = int(os.environ.get("INSTRUMENTATION_LOG_EVERY", "50"))  # Runs between rolling summaries in the log
+
+_local = threading.local()
+_rolling = defaultdict(lambda: deque(maxlen=ROLLING_WINDOW))
+_rolling_lock = threading.Lock()
+_run_count = [0]
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+@contextmanager
+def stage(name, pages=None):
+    """
+    Time a pipeline stage (wall, CPU and self time) and emit a structured record.
+    The yielded dict can be updated inside the block, e.g. record["pages"] = n.
+    Self time excludes nested stages, so lazily rendered PDF windows are not
+    counted twice under OCR.
+    """
+    record = {"stage": name, "pages": pages}
+    if not INSTRUMENTATION_ENABLED:
+        yield record
+        return
+
+    stack = _stack()
+    child_wall = [0.0]
+    stack.append(child_wall)
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield record
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        stack.pop()
+        if stack:
+            stack[-1][0] += wall
+
+        record.update(
+            wall_ms=round(wall * 1000, 3),
+            self_ms=round((wall - child_wall[0]) * 1000, 3),
+            cpu_ms=round(cpu * 1000, 3),
+        )
+        _emit(record)
+
+def timed(name=None, pages=None):
+    """Decorator form of stage(); pages is an optional callable(result) -> page count."""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name) as record:
+                result = func(*args, **kwargs)
+                if pages is not None:
+                    record["pages"] = pages(result)
+                return result
+        return wrapper
+    return decorator
+
+def _emit(record):
+    current_run = getattr(_local, "run", None)
+    if current_run is not None:
+        record["run_id"] = current_run["run_id"]
+        current_run["records"].append(record)
+    record["ts"] = time.time()
+
+    with _rolling_lock:
+        _rolling[record["stage"]].append(record["self_ms"])
+    log_record({"type": "stage", **record})
+
+@contextmanager
+def run(label=None):
+    """
+    Group every stage recorded in this thread into one run and log its summary.
+    Nested run() blocks join the outer run.
+    """
+    if not INSTRUMENTATION_ENABLED or getattr(_local, "run", None) is not None:
+        yield getattr(_local, "run", None)
+        return
+
+    _local.run = {"run_id": uuid.uuid4().hex[:12], "label": label, "records": []}
+    start = time.perf_counter()
+    try:
+        yield _local.run
+    finally:
+        current_run, _local.run = _local.run, None
+        summary = summarize_run(current_run, time.perf_counter() - start)
+        log_record({"type": "run", **summary})
+        log_info(
+            f"[Timing] {label or current_run['run_id']}: {summary['wall_ms']:.0f} ms total, "
+            + ", ".join(f"{name} {s['self_ms']:.0f} ms" for name, s in summary["stages"].items())
+        )
+
+        with _rolling_lock:
+            _run_count[0] += 1
+            log_rolling = _run_count[0] % ROLLING_LOG_EVERY == 0
+        if log_rolling:
+            log_rolling_summary()
+
+def summarize_run(current_run, wall):
+    """Per-stage totals for one run."""
+    stages = {}
+    for record in current_run["records"]:
+        totals = stages.setdefault(record["stage"], {"calls": 0, "wall_ms": 0.0, "self_ms": 0.0, "cpu_ms": 0.0, "pages": 0})
+        totals["calls"] += 1
+        totals["wall_ms"] += record["wall_ms"]
+        totals["self_ms"] += record["self_ms"]
+        totals["cpu_ms"] += record["cpu_ms"]
+        totals["pages"] += record["pages"] or 0
+    for totals in stages.values():
+        for key in ("wall_ms", "self_ms", "cpu_ms"):
+            totals[key] = round(totals[key], 3)
+
+    return {
+        "run_id": current_run["run_id"],
+        "label": current_run["label"],
+        "wall_ms": round(wall * 1000, 3),
+        "stages": stages,
+    }
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def rolling_summary():
+    """p50/p90/p99 self time per stage over the last ROLLING_WINDOW samples."""
+    with _rolling_lock:
+        samples = {name: sorted(values) for name, values in _rolling.items() if values}
+    return {
+        name: {
+            "count": len(values),
+            "p50_ms": _percentile(values, 0.50),
+            "p90_ms": _percentile(values, 0.90),
+            "p99_ms": _percentile(values, 0.99),
+            "mean_ms": round(sum(values) / len(values), 3),
+        }
+        for name, values in samples.items()
+    }
+
+def log_rolling_summary():
+    summary = rolling_summary()
+    log_record({"type": "rolling", "ts": time.time(), "stages": summary})
+    for name, s in summary.items():
+        log_info(f"[Timing] {name}: p50 {s['p50_ms']:.1f} ms, p90 {s['p90_ms']:.1f} ms, p99 {s['p99_ms']:.1f} ms over {s['count']} calls")
@@ -1,25 +1,62 @@
+import json
 import logging
 import os
+import threading
 
 LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-
 LOG_FILE = os.path.join(LOG_DIR, "app.log")
+TIMINGS_FILE = os.path.join(LOG_DIR, "timings.jsonl")
+
+# Structured timing records go to their own JSON-lines file, not app.log
+timings_logger = logging.getLogger("timings")
+
+_configured = False
+_configure_lock = threading.Lock()
+
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+def configure_logging():
+    """
+    Set up the log files and handlers. Runs once, on the first log call,
+    so importing this module does not touch the file system.
+    """
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        os.makedirs(LOG_DIR, exist_ok=True)
+
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            handlers=[
+                logging.FileHandler(LOG_FILE, encoding="utf-8"),
+                logging.StreamHandler()
+            ]
+        )
+
+        timings_logger.setLevel(logging.INFO)
+        timings_logger.propagate = False
+        timings_logger.addHandler(logging.FileHandler(TIMINGS_FILE, encoding="utf-8"))
+        _configured = True
+
+def log_debug(message):
+    configure_logging()
+    logging.debug(message)
 
 def log_info(message):
+    configure_logging()
     logging.info(message)
 
 def log_warning(message):
+    configure_logging()
     logging.warning(message)
 
 def log_error(message):
+    configure_logging()
     logging.error(message)
+
+def log_record(record):
+    configure_logging()
+    timings_logger.info(json.dumps(record, ensure_ascii=False))
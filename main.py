@@ -1,97 +1,50 @@
-from ocr_engine import convert_pdf_to_images, perform_ocr_on_images, perform_ocr_on_image
-from doc_classifier import identify_document_type
-from parser_invoice import parse_invoice, parse_transactions_layout_aware
-from parser_receipt import parse_receipt
-from parser_bank import parse_bank_statement
-from logger import log_info, log_error
+# The OCR stack and parsers (pipeline.py) are imported on the first
+# document, so start-up stays fast
+from logger import log_info
 from error_handler import catch_errors
-from utils import build_output_schema
+from instrumentation import run, timed
 import json
 import datetime
 import os
-import pandas
-from pdf2image import convert_from_path
-from pytesseract import image_to_data, Output
 
 
 
-def save_json(data, document_type):
-    output_dir = "output"
+@timed()
+def save_json(data, document_type, output_dir="output", file_name=None):
     os.makedirs(output_dir, exist_ok=True)
 
-    timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    file_name = f"{document_type}_output_{timestamp}.json"
+    if file_name is None:
+        timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        file_name = f"{document_type}_output_{timestamp}.json"
     output_path = os.path.join(output_dir, file_name)
 
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=4, ensure_ascii=False)
 
     log_info(f"✅ {document_type.capitalize()} data saved to: {output_path}")
+    return output_path
+
+def process_document(file_path, ocr_pages=None, name=None):
+    """
+    Run OCR, classification and parsing on one document.
+    file_path may also be the document's bytes or a binary file-like object;
+    name (e.g. the upload's file name) then labels logs and output metadata.
+    Pass ocr_pages (page results from ocr_engine) to skip the OCR step.
+    Returns (document_type, output_data); raises on unreadable or unknown documents.
+    Uses the process-wide pipeline.Pipeline, so warm state is reused across calls.
+    """
+    from pipeline import get_pipeline
+    result = get_pipeline().process(file_path, name=name, ocr_pages=ocr_pages, raise_errors=True)
+    return result.document_type, result.output
 
 @catch_errors
 def main():
     file_path = input("Enter the path to the PDF or image file: ").strip()
     log_info(f"Received input file: {file_path}")
 
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(file_path)
-
-    # OCR
-    if file_path.lower().endswith(".pdf"):
-        log_info(f"Processing PDF: {file_path}")
-        images = convert_pdf_to_images(file_path)
-        text = perform_ocr_on_images(images)
-        # print("\n--- OCR Text Output ---\n")
-        # print(text)
-    else:
-        log_info(f"Processing Image: {file_path}")
-        text = perform_ocr_on_image(file_path)
-        # print("\n--- OCR Text Output ---\n")
-        # print(text)
-
-    # Classification
-    document_type = identify_document_type(text)
-    log_info(f"Identified document type: {document_type} for file: {file_path}")
-
-    if document_type == "invoice":
-        log_info(f"Starting invoice parsing for: {file_path}")
-        extracted_data = parse_invoice(text)
-
-        # Layout-aware parser call
-        layout_transactions = parse_transactions_layout_aware(
-            file_path,
-            poppler_path=r"C:\poppler-24.08.0\Library\bin"
-        )
-        #
-        # print("\n--- Layout-Aware Extracted Transactions ---")
-        # for i, tx in enumerate(layout_transactions, 1):
-        #     print(f"Item {i}:")
-        #     for k, v in tx.items():
-        #         print(f"  {k}: {v}")
-        #     print()
-
-        if layout_transactions:
-            log_info(f"Enhanced transactions extracted using layout-aware OCR for: {file_path}")
-            extracted_data["transactions"] = layout_transactions
-
-    elif document_type == "receipt":
-        log_info(f"Starting receipt parsing for: {file_path}")
-        extracted_data = parse_receipt(text)
-
-    elif document_type == "bank_statement":
-        log_info(f"Starting bank statement parsing for: {file_path}")
-        extracted_data = parse_bank_statement(text)
-
-    else:
-        log_error(f"[FR06] Failed to identify document type for: {file_path}")
-        raise ValueError("Unknown document type")
-
-    fields = {k: v for k, v in extracted_data.items() if k != "transactions"}
-    transactions = extracted_data.get("transactions", [])
-    output_data = build_output_schema(document_type, file_path, fields, transactions)
-    extracted_data["raw_text"] = text
-
-    save_json(output_data, document_type)
+    with run(file_path):
+        document_type, output_data = process_document(file_path)
+        save_json(output_data, document_type)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,153 @@
+# ocr_backends.py
+
+import os
+import queue
+import shlex
+import subprocess
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from word_boxes import WordBoxes
+
+# Backend settings (edit as needed)
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "pytesseract")          # pytesseract | tesserocr
+OCR_BACKEND_POOL_SIZE = int(os.environ.get("OCR_BACKEND_POOL_SIZE", "1"))  # Engines per process and settings
+
+
+class PytesseractBackend:
+    """Runs the tesseract executable once per call (temp image file + model load each time)."""
+    name = "pytesseract"
+    tesseract_cmd = None  # Set by ocr_engine from TESSERACT_PATH
+
+    def __init__(self):
+        import pytesseract  # Deferred: it imports pandas when installed
+        if self.tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = self.tesseract_cmd
+        self.pytesseract = pytesseract
+
+    @classmethod
+    def engine_version(cls):
+        """First line of `tesseract --version`, without importing pytesseract."""
+        try:
+            output = subprocess.run([cls.tesseract_cmd or "tesseract", "--version"], capture_output=True,
+                                    text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            return "unknown"
+        return output.splitlines()[0].strip() if output.strip() else "unknown"
+
+    def image_to_string(self, image, lang, config):
+        return self.pytesseract.image_to_string(image, lang=lang, config=config)
+
+    def image_to_data(self, image, lang, config):
+        return WordBoxes.from_tsv(self.pytesseract.image_to_data(image, lang=lang, config=config))
+
+
+class TesserocrBackend:
+    """
+    Keeps initialized Tesseract engines resident in the process and hands them
+    out from a pool, so language models are loaded once instead of per call.
+    """
+    name = "tesserocr"
+
+    def __init__(self, pool_size=None):
+        try:
+            import tesserocr  # Optional: resident Tesseract engine through the C API
+        except ImportError:
+            raise ImportError("OCR_BACKEND=tesserocr needs the tesserocr package")
+        self.tesserocr = tesserocr
+        self.pool_size = pool_size or OCR_BACKEND_POOL_SIZE
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def engine_version(cls):
+        try:
+            import tesserocr
+        except ImportError:
+            return "unknown"
+        return tesserocr.tesseract_version().splitlines()[0].strip()
+
+    def _engine_options(self, config):
+        """Translate pytesseract-style config (--psm N, --oem N, -c key=value) into engine options."""
+        options = {"psm": self.tesserocr.PSM.AUTO, "oem": self.tesserocr.OEM.DEFAULT, "variables": {}}
+        args = shlex.split(config or "")
+        for i, arg in enumerate(args):
+            if arg == "--psm" and i + 1 < len(args):
+                options["psm"] = int(args[i + 1])
+            elif arg == "--oem" and i + 1 < len(args):
+                options["oem"] = int(args[i + 1])
+            elif arg == "-c" and i + 1 < len(args) and "=" in args[i + 1]:
+                key, value = args[i + 1].split("=", 1)
+                options["variables"][key] = value
+        return options
+
+    def _create_engine(self, lang, config):
+        options = self._engine_options(config)
+        api = self.tesserocr.PyTessBaseAPI(lang=lang or "eng", psm=options["psm"], oem=options["oem"])
+        for key, value in options["variables"].items():
+            api.SetVariable(key, value)
+        return api
+
+    @contextmanager
+    def _engine(self, lang, config):
+        key = (lang, config)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = {"idle": queue.LifoQueue(), "created": 0}
+            if pool["idle"].empty() and pool["created"] < self.pool_size:
+                pool["created"] += 1
+                pool["idle"].put(self._create_engine(lang, config))
+
+        api = pool["idle"].get()  # Blocks while every engine for these settings is busy
+        try:
+            yield api
+        finally:
+            api.Clear()
+            pool["idle"].put(api)
+
+    def image_to_string(self, image, lang, config):
+        with self._engine(lang, config) as api:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+
+    def image_to_data(self, image, lang, config):
+        with self._engine(lang, config) as api:
+            api.SetImage(image)
+            tsv = api.GetTSVText(0)
+        return WordBoxes.from_tsv(tsv)
+
+    def close(self):
+        with self._lock:
+            for pool in self._pools.values():
+                while not pool["idle"].empty():
+                    pool["idle"].get().End()
+            self._pools.clear()
+
+
+BACKENDS = {
+    "pytesseract": PytesseractBackend,
+    "tesserocr": TesserocrBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_ocr_backend(name=None):
+    """Return the process-wide backend instance for name (default OCR_BACKEND)."""
+    name = name or OCR_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name} (choose from {', '.join(BACKENDS)})")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
+
+@lru_cache(maxsize=None)
+def ocr_backend_id(name=None):
+    """Backend name and Tesseract version, e.g. "tesserocr/tesseract 5.3.0": part of every OCR cache key."""
+    name = name or OCR_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name} (choose from {', '.join(BACKENDS)})")
+    return f"{name}/{BACKENDS[name].engine_version()}"
@@ -0,0 +1,139 @@
+# ocr_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+from logger import log_info, log_warning
+from word_boxes import WordBoxes
+
+# Persistent OCR cache settings (edit as needed)
+OCR_CACHE_ENABLED = os.environ.get("OCR_CACHE", "1") != "0"
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", os.path.join("cache", "ocr"))
+OCR_CACHE_MAX_BYTES = int(os.environ.get("OCR_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_cache_size = None
+
+
+def file_sha256(file_path):
+    """Content hash of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def content_sha256(source):
+    """Content hash of a document given as a path or as bytes."""
+    if isinstance(source, str):
+        return file_sha256(source)
+    return hashlib.sha256(source).hexdigest()
+
+def page_cache_key(content_hash, page_index, dpi, lang, config):
+    """Cache key for one page: content hash plus every setting that changes the OCR output."""
+    settings = json.dumps([page_index, dpi, lang, config])
+    return content_hash + "-" + hashlib.sha256(settings.encode("utf-8")).hexdigest()[:16]
+
+def page_to_dict(page):
+    """JSON-serializable form of a page result from ocr_engine.ocr_page_data."""
+    return {"text": page["text"], "words": page["words"].to_dict(), "source": page.get("source", "ocr")}
+
+def page_from_dict(entry):
+    return {"text": entry["text"], "words": WordBoxes.from_columns(entry["words"]), "source": entry.get("source", "ocr")}
+
+def _entry_path(key):
+    return os.path.join(OCR_CACHE_DIR, key[:2], key + ".json")
+
+def cache_get(key):
+    """Return the cached page result for key, or None on a miss."""
+    if not OCR_CACHE_ENABLED:
+        return None
+
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        os.utime(path)  # Mark as recently used for LRU eviction
+    except FileNotFoundError:
+        stats["misses"] += 1
+        return None
+    except (OSError, ValueError) as e:
+        log_warning(f"Ignoring unreadable OCR cache entry {path}: {str(e)}")
+        stats["misses"] += 1
+        return None
+
+    stats["hits"] += 1
+    return page_from_dict(entry)
+
+def cache_put(key, page):
+    """Store a page result and evict least recently used entries past the size limit."""
+    global _cache_size
+    if not OCR_CACHE_ENABLED:
+        return
+
+    path = _entry_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    entry = page_to_dict(page)
+
+    # Unique temp file per writer: threads and processes may store the same key at once
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+            size = f.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    stats["writes"] += 1
+
+    if _cache_size is None:
+        _cache_size = sum(size for _, size, _ in _list_entries())
+    else:
+        _cache_size += size
+
+    if _cache_size > OCR_CACHE_MAX_BYTES:
+        evict()
+
+def _list_entries():
+    """(path, size, last_used) for every cache entry."""
+    entries = []
+    for root, _, files in os.walk(OCR_CACHE_DIR):
+        for name in files:
+            if name.endswith(".json"):
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:  # Evicted by another process meanwhile
+                    continue
+                entries.append((path, st.st_size, st.st_mtime))
+    return entries
+
+def evict(max_bytes=None):
+    """Delete least recently used entries until the cache fits in max_bytes."""
+    global _cache_size
+    max_bytes = OCR_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = sorted(_list_entries(), key=lambda e: e[2])
+    total = sum(size for _, size, _ in entries)
+
+    for path, size, _ in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        stats["evictions"] += 1
+
+    _cache_size = total
+
+def log_cache_stats():
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = (stats["hits"] / lookups * 100) if lookups else 0.0
+    log_info(
+        f"OCR cache: {stats['hits']} hits, {stats['misses']} misses ({hit_rate:.0f}% hit rate), "
+        f"{stats['writes']} writes, {stats['evictions']} evictions"
+    )
@@ -1,35 +1,385 @@
 # ocr_engine.py
 
-import pytesseract
-from pdf2image import convert_from_path
-from pytesseract import image_to_string, image_to_data
 from PIL import Image
+from collections import deque
+from functools import partial
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from ocr_cache import OCR_CACHE_ENABLED, content_sha256, page_cache_key, cache_get, cache_put, log_cache_stats
+from instrumentation import stage, timed
+from pdf_text import PYMUPDF_INSTALLED, extract_pdf_text_layer, pdf_page_count, render_pdf_pages
+from doc_source import load_source, is_path, source_name, open_image
+from ocr_backends import PytesseractBackend, get_ocr_backend, ocr_backend_id
+from logger import log_info
 import os
 
 # Set Tesseract and Poppler paths (edit as needed)
 TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 POPPLER_PATH = r"C:\poppler-24.08.0\Library\bin"
 
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+# OCR settings (part of the OCR cache key)
+OCR_DPI = int(os.environ.get("OCR_DPI", "200"))
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+OCR_CONFIG = os.environ.get("OCR_CONFIG", "")
 
+# Parallel OCR settings (1 worker keeps the sequential path)
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", "1"))
+OCR_MAX_IN_FLIGHT = int(os.environ.get("OCR_MAX_IN_FLIGHT", "0"))  # 0 = 2 pages per worker
 
+# Number of PDF pages rasterized at a time by the streaming path
+PDF_CHUNK_SIZE = int(os.environ.get("PDF_CHUNK_SIZE", "4"))
+
+# Image normalization before Tesseract: rescale so text lines are about
+# OCR_TARGET_TEXT_HEIGHT px tall and never feed more than OCR_MAX_PIXELS
+OCR_NORMALIZE = os.environ.get("OCR_NORMALIZE", "1") != "0"
+OCR_TARGET_TEXT_HEIGHT = int(os.environ.get("OCR_TARGET_TEXT_HEIGHT", "32"))
+OCR_MAX_PIXELS = int(os.environ.get("OCR_MAX_PIXELS", str(8_000_000)))
+OCR_MIN_SCALE = 0.5
+OCR_MAX_SCALE = 3.0
+OCR_SCALE_DEADBAND = 0.2  # Skip resampling when the scale is within 20% of 1
+
+PytesseractBackend.tesseract_cmd = TESSERACT_PATH
+
+
+@timed(pages=len)
 def convert_pdf_to_images(pdf_path):
-    """Convert each page of PDF into an image."""
-    images = convert_from_path(pdf_path, poppler_path=POPPLER_PATH)
+    """Convert each page of PDF (path or bytes) into an image."""
+    pdf_path = load_source(pdf_path)
+    if not is_path(pdf_path):
+        return render_pages(pdf_path, 1, get_pdf_page_count(pdf_path))
+    from pdf2image import convert_from_path
+    images = convert_from_path(pdf_path, dpi=OCR_DPI, poppler_path=POPPLER_PATH)
     return images
 
-def perform_ocr_on_images(images):
+def get_pdf_page_count(pdf_path):
+    """Read the page count from the PDF info without rendering anything."""
+    if not is_path(pdf_path):
+        if PYMUPDF_INSTALLED:
+            return pdf_page_count(pdf_path)
+        from pdf2image import pdfinfo_from_bytes
+        return int(pdfinfo_from_bytes(pdf_path, poppler_path=POPPLER_PATH)["Pages"])
+    from pdf2image import pdfinfo_from_path
+    info = pdfinfo_from_path(pdf_path, poppler_path=POPPLER_PATH)
+    return int(info["Pages"])
+
+def render_pages(pdf_path, first_page, last_page, dpi=None, poppler_path=None):
+    """
+    Rasterize pages first_page..last_page (1-based) of a PDF path or PDF bytes.
+    Bytes are rendered in memory by PyMuPDF when it is installed; pdf2image
+    would write them to a temp file on every call.
+    """
+    dpi = dpi or OCR_DPI
+    if not is_path(pdf_path):
+        if PYMUPDF_INSTALLED:
+            return render_pdf_pages(pdf_path, first_page, last_page, dpi)
+        from pdf2image import convert_from_bytes
+        return convert_from_bytes(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page,
+                                  poppler_path=poppler_path or POPPLER_PATH)
+    from pdf2image import convert_from_path
+    return convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page,
+                             poppler_path=poppler_path or POPPLER_PATH)
+
+def iter_pdf_pages(pdf_path, chunk_size=None):
+    """
+    Yield PDF pages as images, rendering only chunk_size pages at a time
+    (first_page/last_page windows) so peak memory follows the window size.
+    """
+    for _, image in iter_pdf_pages_indexed(pdf_path, chunk_size=chunk_size):
+        yield image
+
+def iter_pdf_pages_indexed(pdf_path, page_indexes=None, chunk_size=None, page_count=None):
+    """
+    Yield (page_index, image) for the requested 0-based pages (all by default).
+    Windows that contain no requested page are never rendered.
+    """
+    pdf_path = load_source(pdf_path)
+    chunk_size = chunk_size or PDF_CHUNK_SIZE
+    page_count = page_count or get_pdf_page_count(pdf_path)
+    wanted = set(range(page_count) if page_indexes is None else page_indexes)
+
+    for first_page in range(1, page_count + 1, chunk_size):
+        last_page = min(first_page + chunk_size - 1, page_count)
+        window_indexes = [i for i in range(first_page - 1, last_page) if i in wanted]
+        if not window_indexes:
+            continue
+
+        with stage("convert_pdf_to_images", pages=last_page - first_page + 1):
+            window = render_pages(pdf_path, first_page, last_page)
+        window.reverse()
+        index = first_page - 1
+        while window:
+            # Drop our reference as soon as the page is handed out
+            image = window.pop()
+            if index in wanted:
+                yield index, image
+            index += 1
+
+def estimate_text_height(image):
+    """
+    Estimate the typical text line height (px) from the horizontal ink profile:
+    rows containing dark pixels form runs, one run per text line.
+    Returns None when the page does not look like dark text on a light background.
+    """
+    probe = image.convert("L")
+    factor = max(1, probe.width // 1000)
+    if factor > 1:
+        probe = probe.reduce(factor)
+
+    ink_rows = (np.asarray(probe) < 128).mean(axis=1) > 0.01
+    if ink_rows.mean() > 0.8:
+        return None
+
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], ink_rows.astype(np.int8), [0]))))
+    heights = edges[1::2] - edges[::2]
+    heights = heights[heights >= 2]
+    if len(heights) < 3:
+        return None
+    return float(np.median(heights)) * factor
+
+def normalize_image_for_ocr(image):
+    """
+    Downscale oversized pages and upscale tiny text before Tesseract.
+    Returns (image, scale); scale maps original coordinates to OCR coordinates.
+    """
+    if not OCR_NORMALIZE:
+        return image, 1.0
+
+    width, height = image.size
+    text_height = estimate_text_height(image)
+    scale = 1.0
+    if text_height:
+        scale = min(max(OCR_TARGET_TEXT_HEIGHT / text_height, OCR_MIN_SCALE), OCR_MAX_SCALE)
+        if abs(scale - 1.0) < OCR_SCALE_DEADBAND:
+            scale = 1.0
+    if width * height * scale * scale > OCR_MAX_PIXELS:
+        scale = (OCR_MAX_PIXELS / (width * height)) ** 0.5
+
+    if scale == 1.0:
+        return image, 1.0
+
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    resample = Image.Resampling.LANCZOS if scale < 1 else Image.Resampling.BICUBIC
+    saved = width * height - size[0] * size[1]
+    log_info(
+        f"OCR input {width}x{height} -> {size[0]}x{size[1]} (text height {text_height or 0:.0f}px): "
+        f"{saved:,} pixels saved ({saved / (width * height):.0%})"
+    )
+    return image.resize(size, resample), scale
+
+def ocr_page(image):
+    """Run OCR on a single page image (runs inside pool workers)."""
+    image, _ = normalize_image_for_ocr(image)
+    return get_ocr_backend().image_to_string(image, OCR_LANG, OCR_CONFIG)
+
+def clean_ocr_words(words):
+    """Keep only word-level rows with non-empty text from image_to_data output."""
+    words = words[words["level"] == 5]
+    words = words.assign(text=[t.strip() for t in words["text"]])
+    return words[words["text"] != ""]
+
+def words_to_text(words):
+    """Rebuild plain page text from word-level OCR output, one OCR line per line."""
+    lines = []
+    last_par = None
+    texts, blocks, pars = words["text"], words["block_num"], words["par_num"]
+    for line in words.line_groups():
+        par = (blocks[line[0]], pars[line[0]])
+        if last_par is not None and par != last_par:
+            lines.append("")
+        lines.append(" ".join(texts[line]))
+        last_par = par
+    return "\n".join(lines)
+
+def ocr_page_data(image, config=None, normalize=True):
+    """
+    Run word-level OCR on a single page image (runs inside pool workers).
+    Returns {"text": page text, "words": WordBoxes of words with boxes and confidences}.
+    config overrides OCR_CONFIG, e.g. for table regions; normalize=False OCRs the
+    image at its own resolution (regions deliberately rendered at a higher DPI).
+    """
+    ocr_image, scale = normalize_image_for_ocr(image) if normalize else (image, 1.0)
+    words = clean_ocr_words(get_ocr_backend().image_to_data(ocr_image, OCR_LANG, OCR_CONFIG if config is None else config))
+    if scale != 1.0:
+        # Report boxes in the coordinates of the page image that was passed in
+        words = words.assign(**{c: words[c] / scale for c in ["left", "top", "width", "height"]})
+    return {"text": words_to_text(words), "words": words}
+
+def ocr_indexed_page_data(item, config=None):
+    """ocr_page_data for an (index, image) pair, keeping the index for reassembly."""
+    index, image = item
+    return index, ocr_page_data(image, config)
+
+def map_pages(func, pages, workers=None, max_in_flight=None, pool=None):
+    """
+    Apply func to every page and yield the results in page order.
+    With more than one worker, pages are fanned out to a process pool while
+    at most max_in_flight pages are submitted and not yet consumed.
+    Pass pool (with workers set to its size) to reuse a running executor
+    instead of starting one per call.
+    """
+    workers = OCR_WORKERS if workers is None else workers
+    if pool is None and workers <= 1:
+        yield from map(func, pages)
+        return
+
+    max_in_flight = max_in_flight or OCR_MAX_IN_FLIGHT or workers * 2
+    if pool is not None:
+        yield from _map_in_pool(pool, func, pages, max_in_flight)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from _map_in_pool(pool, func, pages, max_in_flight)
+
+def _map_in_pool(pool, func, pages, max_in_flight):
+    pending = deque()
+    try:
+        for page in pages:
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+            pending.append(pool.submit(func, page))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # Consumer stopped early: drop the pages that have not started yet
+        for future in pending:
+            future.cancel()
+
+def perform_ocr_on_images(images, workers=None, max_in_flight=None):
     """Run OCR on list of images and return full text."""
     full_text = ""
-    for img in images:
-        text = pytesseract.image_to_string(img)
-        full_text += text + "\n"
+    with stage("perform_ocr_on_images", pages=0) as record:
+        for text in map_pages(ocr_page, images, workers, max_in_flight):
+            full_text += text + "\n"
+            record["pages"] += 1
     return full_text
 
+def perform_ocr_on_pdf(pdf_path, workers=None, max_in_flight=None, chunk_size=None):
+    """Stream a PDF through rasterization and OCR and return full text."""
+    return perform_ocr_on_images(iter_pdf_pages(pdf_path, chunk_size), workers, max_in_flight)
+
 def perform_ocr_on_image(image_path):
-    """Run OCR on a single image file (e.g., PNG, JPG)."""
-    image = Image.open(image_path)
-    return image_to_string(image)
+    """Run OCR on a single image (e.g., PNG, JPG) given as a path, bytes or file-like object."""
+    with stage("perform_ocr_on_images", pages=1):
+        return ocr_page(open_image(load_source(image_path)))
+
+def perform_ocr_with_data(images, workers=None, max_in_flight=None):
+    """Run word-level OCR on a list of images and return one page result per image."""
+    with stage("perform_ocr_on_images") as record:
+        pages = list(map_pages(ocr_page_data, images, workers, max_in_flight))
+        record["pages"] = len(pages)
+    return pages
+
+def _page_cache_keys(source, page_count, dpi, config=None, content_hash=None):
+    if not OCR_CACHE_ENABLED:
+        return [None] * page_count
+    content_hash = content_hash or content_sha256(source)
+    config = OCR_CONFIG if config is None else config
+    if OCR_NORMALIZE:
+        config += f"|normalize:{OCR_TARGET_TEXT_HEIGHT}:{OCR_MAX_PIXELS}"
+    config += f"|backend:{ocr_backend_id()}"  # pytesseract and tesserocr output differ
+    return [page_cache_key(content_hash, i, dpi, OCR_LANG, config) for i in range(page_count)]
+
+def stream_pdf_page_data(pdf_path, workers=None, max_in_flight=None, chunk_size=None, pool=None,
+                         page_indexes=None, config=None, content_hash=None):
+    """
+    Streaming form of perform_ocr_on_pdf_with_data. Returns (page count, iterator
+    of (page index, page result)): pages come in page order as soon as each is
+    ready, while later pages are still being OCRed in the pool. Closing the
+    iterator early cancels the pages not started yet. content_hash (the
+    document's content_sha256) saves hashing the file again for the cache keys.
+    """
+    pdf_path = load_source(pdf_path)
+
+    # Born-digital pages: take words and boxes from the text layer
+    # (page counts are set inside the stage: its record is written when the block exits)
+    with stage("extract_pdf_text_layer") as record:
+        text_layer = extract_pdf_text_layer(pdf_path, OCR_DPI, page_indexes)
+        page_count = len(text_layer) if text_layer is not None else get_pdf_page_count(pdf_path)
+        wanted = range(page_count) if page_indexes is None else sorted(page_indexes)
+        ready = {}
+        record["pages"] = len(wanted)
+
+        if text_layer:
+            for index, words in enumerate(text_layer):
+                if words is not None:
+                    ready[index] = {"text": words_to_text(words), "words": words, "source": "text_layer"}
+            record["native_pages"] = len(ready)
+    if text_layer:
+        log_info(f"Text layer used for {len(ready)}/{len(wanted)} pages of {source_name(pdf_path)}")
+
+    scanned = [i for i in wanted if i not in ready]
+    keys = _page_cache_keys(pdf_path, page_count, OCR_DPI, config, content_hash) if scanned else [None] * page_count
+    for index in scanned:
+        page = cache_get(keys[index]) if keys[index] else None
+        if page is not None:
+            ready[index] = page
+    missing = [i for i in scanned if i not in ready]
+
+    def ocr_missing():
+        if not missing:
+            return
+        with stage("perform_ocr_on_images", pages=len(missing)):
+            images = iter_pdf_pages_indexed(pdf_path, missing, chunk_size, page_count)
+            ocr_func = ocr_indexed_page_data if config is None else partial(ocr_indexed_page_data, config=config)
+            yield from map_pages(ocr_func, images, workers, max_in_flight, pool)
+
+    def pages():
+        ocr_results = ocr_missing()
+        try:
+            for index in wanted:
+                if index in ready:
+                    yield index, ready.pop(index)
+                    continue
+                # OCR results arrive in page order, so the next one is this page
+                index, page = next(ocr_results)
+                if keys[index]:
+                    cache_put(keys[index], page)
+                yield index, page
+        finally:
+            ocr_results.close()
+            if OCR_CACHE_ENABLED:
+                log_cache_stats()
+
+    return page_count, pages()
+
+def perform_ocr_on_pdf_with_data(pdf_path, workers=None, max_in_flight=None, chunk_size=None, pool=None,
+                                 page_indexes=None, config=None, content_hash=None):
+    """
+    Stream a PDF (path, bytes or file-like object) through rasterization and
+    word-level OCR. Pages with a usable text layer are read directly, and
+    pages found in the OCR cache are neither rendered nor OCRed again.
+    page_indexes (0-based) limits the work to those pages; the others are
+    None in the returned list. config overrides OCR_CONFIG for this call.
+    """
+    page_count, stream = stream_pdf_page_data(pdf_path, workers, max_in_flight, chunk_size, pool,
+                                              page_indexes, config, content_hash)
+    pages = [None] * page_count
+    for index, page in stream:
+        pages[index] = page
+    return pages
+
+def perform_ocr_on_image_with_data(image_path):
+    """Run word-level OCR on a single image (path, bytes or file-like object) and return a one-page result."""
+    image_path = load_source(image_path)
+    key = _page_cache_keys(image_path, 1, None)[0]
+    page = cache_get(key) if key else None
+
+    if page is None:
+        with stage("perform_ocr_on_images", pages=1):
+            page = ocr_page_data(open_image(image_path))
+        if key:
+            cache_put(key, page)
+
+    if OCR_CACHE_ENABLED:
+        log_cache_stats()
+    return [page]
+
+def ocr_result_text(pages):
+    """Plain document text for classification and the text parsers (pages not OCRed are skipped)."""
+    return "".join(page["text"] + "\n" for page in pages if page is not None)
+
+def get_ocr_words(image):
+    return get_ocr_backend().image_to_data(image, OCR_LANG, OCR_CONFIG)
 
 def get_ocr_dataframe(image):
-    return image_to_data(image, output_type=pytesseract.Output.DATAFRAME)
+    """image_to_data output as a pandas DataFrame (needs pandas)."""
+    return get_ocr_words(image).to_dataframe()
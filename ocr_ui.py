@@ -1,91 +1,139 @@
 import streamlit as st
+import hashlib
 import json
 import os
 import datetime
-from ocr_engine import convert_pdf_to_images, perform_ocr_on_images, perform_ocr_on_image
-from doc_classifier import identify_document_type
-from parser_invoice import parse_invoice, parse_transactions_layout_aware
-from parser_receipt import parse_receipt
-from parser_bank import parse_bank_statement
-from utils import build_output_schema
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+# Streamlit re-runs this script on every interaction: OCR and parser
+# modules are imported by load_pipeline, once a file is uploaded
 from logger import log_info, log_error
 from error_handler import catch_errors
+from instrumentation import run
+
+# UI result cache (edit as needed): results are keyed by upload content hash
+UI_CACHE_ENTRIES = int(os.environ.get("UI_CACHE_ENTRIES", "32"))    # Documents kept per server process
+UI_CACHE_TTL = int(os.environ.get("UI_CACHE_TTL", "3600"))          # Seconds before a cached result expires
+UI_WORKERS = int(os.environ.get("UI_WORKERS", "2"))                 # Uploads processed at once, shared by all sessions
 
 st.set_page_config(page_title="OCR Extraction Tool", layout="wide")
 st.title("📄 Smart OCR Document Parser")
 
-uploaded_file = st.file_uploader("Upload a PDF or Image", type=["pdf", "png", "jpg", "jpeg"])
-
-@catch_errors
-def process_ocr(file_path, display_name):
+uploaded_files = st.file_uploader("Upload PDFs or Images", type=["pdf", "png", "jpg", "jpeg"], accept_multiple_files=True)
+
+@st.cache_resource(show_spinner=False)
+def load_pipeline():
+    """Pipeline shared by all sessions, so the OCR backend and parsers survive reruns."""
+    from pipeline import Pipeline
+    return Pipeline(preload_ocr=True)
+
+@st.cache_resource(show_spinner=False)
+def get_executor():
+    """Background threads that run uploads; OCR itself runs in Tesseract, outside the GIL."""
+    return ThreadPoolExecutor(max_workers=UI_WORKERS, thread_name_prefix="ocr_ui")
+
+@st.cache_data(max_entries=UI_CACHE_ENTRIES, ttl=UI_CACHE_TTL, show_spinner=False)
+def analyze_upload(content_hash, display_name, _file_bytes):
+    """
+    OCR, classify and parse one upload. Memoized by content hash (the bytes
+    themselves are not hashed again), so reruns and repeat uploads are instant.
+    """
+    # The upload bytes go straight to the pipeline: no temp file per upload
+    with run(display_name):
+        result = _process_ocr(_file_bytes, display_name)
+
+    if result["output"] is not None:
+        save_output(result, content_hash)
+    return result
+
+def _process_ocr(file_bytes, display_name):
     log_info(f"[UI] File received: {display_name}")
+    document = load_pipeline().process(file_bytes, name=display_name)
+    log_info(f"[UI] Detected document type: {document.document_type}")
+    result = {"text": document.text, "document_type": document.document_type, "output": None}
 
-    # OCR phase
-    if file_path.lower().endswith(".pdf"):
-        images = convert_pdf_to_images(file_path)
-        text = perform_ocr_on_images(images)
-    else:
-        text = perform_ocr_on_image(file_path)
-
-    st.subheader("📝 OCR Extracted Text")
-    st.text_area("Extracted Text", text, height=300)
-
-    document_type = identify_document_type(text)
-    st.success(f"📌 Detected Document Type: {document_type.upper()}")
-    log_info(f"[UI] Detected document type: {document_type}")
-
-    extracted_data = {}
+    if document.document_type == "unknown":
+        log_error("[UI] Could not identify document type")
+        return result
+    if not document.ok:
+        raise RuntimeError(document.error)
 
-    if document_type == "invoice":
-        log_info("[UI] Running invoice parser")
-        extracted_data = parse_invoice(text)
-        transactions = parse_transactions_layout_aware(file_path)
-        if transactions:
-            extracted_data["transactions"] = transactions
+    output = document.output
+    result.update(fields=output["fields"], transactions=output["transactions"], output=output)
+    return result
 
-    elif document_type == "receipt":
-        log_info("[UI] Running receipt parser")
-        extracted_data = parse_receipt(text)
+def save_output(result, content_hash):
+    """Save JSON once per analyzed document (not on every rerun)."""
+    timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    file_name = f"{result['document_type']}_output_{timestamp}_{content_hash[:8]}.json"
+    output_path = os.path.join("output", file_name)
+    os.makedirs("output", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result["output"], f, indent=4, ensure_ascii=False)
+    result["file_name"] = file_name
 
-    elif document_type == "bank_statement":
-        log_info("[UI] Running bank statement parser")
-        extracted_data = parse_bank_statement(text)
+def show_result(result, key):
+    """Render one analyzed document; key keeps widget IDs unique across files."""
+    st.subheader("📝 OCR Extracted Text")
+    st.text_area("Extracted Text", result["text"], height=300, key=f"{key}_text")
 
-    else:
-        log_error("[UI] Could not identify document type")
+    st.success(f"📌 Detected Document Type: {result['document_type'].upper()}")
+    if result["output"] is None:
         st.warning("⚠️ Could not determine document type. Only showing OCR text.")
         return
 
-    fields = {k: v for k, v in extracted_data.items() if k != "transactions"}
-    transactions = extracted_data.get("transactions", [])
-    output = build_output_schema(document_type, file_path, fields, transactions)
-
     # Show extracted fields
     st.subheader("📋 Extracted Header Fields")
-    st.write(fields)
+    st.write(result["fields"])
 
     st.subheader("🧾 Extracted Transactions")
-    st.write(transactions)
+    st.write(result["transactions"])
 
     st.subheader("📤 Final Output (JSON)")
-    st.json(output)
+    st.json(result["output"])
 
-    # Save JSON for download
-    timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    file_name = f"{document_type}_output_{timestamp}.json"
-    output_path = os.path.join("output", file_name)
-    os.makedirs("output", exist_ok=True)
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=4, ensure_ascii=False)
-
-    with open(output_path, "rb") as f:
-        st.download_button("💾 Download JSON", f, file_name=file_name)
+    output_json = json.dumps(result["output"], indent=4, ensure_ascii=False)
+    st.download_button("💾 Download JSON", output_json, file_name=result["file_name"], mime="application/json", key=f"{key}_download")
 
-if uploaded_file:
-    ext = uploaded_file.name.split('.')[-1]
-    temp_file_path = f"temp_upload.{ext}"
-    with open(temp_file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+@catch_errors
+def process_upload(content_hash, display_name, file_bytes, ctx=None):
+    """Runs on an executor thread; returns None when processing failed (error is logged)."""
+    if ctx is not None:
+        add_script_run_ctx(ctx=ctx)  # Let cached functions see the session that submitted the file
+    return analyze_upload(content_hash, display_name, file_bytes)
+
+def process_uploads(files):
+    """Fan the uploads out to the background executor and show per-file progress."""
+    executor = get_executor()
+    ctx = get_script_run_ctx()
+    progress = st.progress(0.0, text=f"⏳ Processing {len(files)} file(s)")
+    status = {}
+    futures = {}
+    for index, uploaded in enumerate(files):
+        file_bytes = uploaded.getvalue()
+        content_hash = hashlib.sha256(file_bytes).hexdigest()
+        status[index] = st.empty()
+        status[index].info(f"⏳ Queued: {uploaded.name}")
+        futures[executor.submit(process_upload, content_hash, uploaded.name, file_bytes, ctx)] = index
+
+    results = [None] * len(files)
+    for done, future in enumerate(as_completed(futures), 1):
+        index = futures[future]
+        name = files[index].name
+        results[index] = future.result()
+        if results[index] is None:
+            status[index].error(f"❌ Failed: {name} (see logs/app.log)")
+        else:
+            status[index].success(f"✅ Done: {name} ({results[index]['document_type']})")
+        progress.progress(done / len(files), text=f"Processed {done}/{len(files)} file(s)")
+
+    finished = [(files[i].name, result, i) for i, result in enumerate(results) if result is not None]
+    if not finished:
+        return
+    tabs = st.tabs([name for name, _, _ in finished])
+    for tab, (name, result, index) in zip(tabs, finished):
+        with tab:
+            show_result(result, key=f"{index}_{name}")
 
-    st.info(f"⏳ Processing file: {uploaded_file.name}")
-    process_ocr(temp_file_path, uploaded_file.name)
+if uploaded_files:
+    process_uploads(uploaded_files)
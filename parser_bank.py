@@ -1,74 +1,188 @@
 import re
-from utils import clean_text, extract_match
+from field_rules import BANK_RULESET, extract_fields
+from instrumentation import timed
 
-def parse_bank_statement(text):
+TABLE_HEADER_PATTERN = re.compile(r"date\s+description.*(amount|debit|credit)", re.IGNORECASE)
+TRANSACTION_START_PATTERN = re.compile(r"\d{2}[\/\-\.]\d{2}[\/\-\.]\d{2,4}")
+LINE_PATTERN = re.compile(r"[^\r\n]+")
+COLUMN_GAP_PATTERN = re.compile(r"\s{2,}")
+TRANSACTION_FALLBACK_PATTERN = re.compile(r"(?P<date>\d{2}[\/\-\.]\d{2}[\/\-\.]\d{2,4})\s+(?P<desc>.+?)\s+(-?[0-9.,]+)(?:\s+(?P<balance>-?[0-9.,]*\d))?")
+OPENING_BALANCE_PATTERN = re.compile(r"(?:opening\s*balance|solde\s*initial|ancien\s*solde)\s*[:\-]?\s*(-?[0-9.,]*\d)", re.IGNORECASE)
+AMOUNT_PATTERN = re.compile(r"-?\d+(?:[ '.,]\d{3})*(?:[.,]\d{1,2})?(?!\d)")  # 1 234,56 / 1,234.56 / -200.00
+GROUP_SEPARATOR_PATTERN = re.compile(r"[' ]")
+DECIMAL_SEPARATOR_PATTERN = re.compile(r"[.,]")
+
+# Lines kept for the header fields, however long the statement (edit as needed);
+# lines with a header keyword and the line after each are kept past the cap
+MAX_HEADER_LINES = 200
+
+
+def iter_lines(source):
     """
-    Parses bank statement text and extracts general information and transactions.
-    Returns structured data matching expected schema.
+    Lines of a statement given as one text, or as an iterable of page texts
+    or OCR lines (e.g. pages as they come out of OCR). Nothing is split up front;
+    tabs become column gaps (two spaces).
     """
-    text = clean_text(text)
-    lines = text.split("\n")
-
-    # --- General Info Extraction with Fallbacks ---
-    header = {
-        "statement_date": extract_match(r"(statement\s*date)\s*[:\-]?\s*(\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4})", text, 2),
-        "period_covered": extract_match(r"(period\s*covered|date\s*range)\s*[:\-]?\s*(.+?)(?=\n|$)", text, 2),
-        "opening_balance": extract_match(r"(opening\s*balance)\s*[:\-]?\s*([0-9.,\-]+)", text, 2),
-        "closing_balance": extract_match(r"(closing\s*balance)\s*[:\-]?\s*([0-9.,\-]+)", text, 2),
-        "currency": extract_match(r"(currency)\s*[:\-]?\s*([A-Z]{3})", text, 2),
-        "account_number": extract_match(r"(account\s*number|iban)\s*[:\-]?\s*([A-Z0-9\- ]{5,})", text, 2),
-        "account_holder": extract_match(r"(account\s*holder|client\s*name)\s*[:\-]?\s*(.+)", text, 2)
-    }
+    if isinstance(source, str):
+        source = (source,)
+    for chunk in source:
+        for match in LINE_PATTERN.finditer(chunk):
+            yield match.group().replace("\t", "  ")
+
+
+def parse_amount(text):
+    """Value of an amount cell ("1,234.56", "1.234,56", "-200.00"), or None."""
+    match = AMOUNT_PATTERN.search(text or "")
+    if match is None:
+        return None
+    digits = GROUP_SEPARATOR_PATTERN.sub("", match.group())
+    # The last separator followed by one or two digits is the decimal point
+    last = max(digits.rfind(","), digits.rfind("."))
+    if last != -1 and len(digits) - last - 1 in (1, 2):
+        digits = DECIMAL_SEPARATOR_PATTERN.sub("", digits[:last]) + "." + digits[last + 1:]
+    else:
+        digits = DECIMAL_SEPARATOR_PATTERN.sub("", digits)
+    try:
+        return float(digits)
+    except ValueError:
+        return None
+
+def settle_type(transaction, previous_balance):
+    """
+    Set transaction["type"] from the running balance when it moved by exactly the
+    amount: the balance is the ground truth where the column or sign of the amount
+    is ambiguous. Returns the balance after the transaction (None when unknown).
+    """
+    amount = parse_amount(transaction["amount"])
+    balance = parse_amount(transaction["balance"])
+    if amount is not None and balance is not None and previous_balance is not None:
+        delta = balance - previous_balance
+        if abs(delta + abs(amount)) < 0.005:
+            transaction["type"] = "debit"
+        elif abs(delta - abs(amount)) < 0.005:
+            transaction["type"] = "credit"
+    if balance is not None:
+        return balance
+    if previous_balance is not None and amount is not None and transaction["type"]:
+        return previous_balance + (abs(amount) if transaction["type"] == "credit" else -abs(amount))
+    return None
+
+
+class BankStatementStream:
+    """
+    One pass over a statement. Iterating it yields each transaction as soon as
+    its last line has been read; only that transaction's lines and a bounded
+    set of header lines are held, so memory does not grow with the statement.
+    The header fields are extracted on first access of .header, from the lines
+    before the transaction table plus the lines inside it that mention a header
+    keyword (e.g. a closing balance after the last row) and the line after each.
+    Debit or credit follows the running balance from the opening balance on
+    (see settle_type) wherever it is printed.
+    """
+
+    def __init__(self, source):
+        self.lines = iter_lines(source)
+        self.header_lines = []
+        self.finished = False
+        self._header = None
 
-    # --- Transaction Parsing ---
-    transactions = []
-    collecting = False
-    buffer = []
+    def _keep_header_line(self, line, always=False):
+        """Keep a line for the header fields; past MAX_HEADER_LINES only lines kept always."""
+        if always or len(self.header_lines) < MAX_HEADER_LINES:
+            self.header_lines.append(line)
 
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+    def __iter__(self):
+        collecting = False
+        keep_next = False
+        buffer = []
+        balance = None
 
-        # Detect start of transaction block
-        if re.search(r"date\s+description.*(amount|debit|credit)", line.lower()):
-            collecting = True
-            continue
+        for line in self.lines:
+            line = line.strip()
+            if not line:
+                continue
+
+            # Detect start of transaction block (repeated on later pages)
+            if TABLE_HEADER_PATTERN.search(line):
+                collecting = True
+                continue
+
+            # Lines mentioning a header keyword and the line after each are always kept,
+            # so fields survive the cap when the table header is not recognized
+            mentions_header = BANK_RULESET["scanner"].search(line) is not None
+            keep = mentions_header or keep_next
+            keep_next = mentions_header
+
+            if not collecting:
+                self._keep_header_line(line, always=keep)
+                opening = OPENING_BALANCE_PATTERN.search(line)
+                if opening:
+                    balance = parse_amount(opening.group(1))
+                continue
+
+            if keep:
+                self._keep_header_line(line, always=True)
 
-        if collecting:
             # Look for typical transaction lines or multi-line entries
-            if re.match(r"\d{2}[\/\-\.]\d{2}[\/\-\.]\d{2,4}", line):
+            if TRANSACTION_START_PATTERN.match(line):
                 if buffer:
-                    transactions.append(parse_transaction_line(buffer))
-                    buffer = []
-                buffer.append(line)
+                    transaction = parse_transaction_line(buffer)
+                    balance = settle_type(transaction, balance)
+                    yield transaction
+                buffer = [line]
             else:
                 buffer.append(line)
 
-    # Final transaction if buffer isn't empty
-    if buffer:
-        transactions.append(parse_transaction_line(buffer))
+        # Final transaction if buffer isn't empty
+        if buffer:
+            transaction = parse_transaction_line(buffer)
+            settle_type(transaction, balance)
+            yield transaction
+        self.finished = True
+
+    @property
+    def header(self):
+        """Header fields from the lines read so far (cached once the statement is fully read)."""
+        if self._header is not None:
+            return self._header
+        header = extract_fields(BANK_RULESET, "\n".join(self.header_lines))
+        if self.finished:
+            self._header = header
+        return header
+
+
+@timed()
+def parse_bank_statement(text):
+    """
+    Parses bank statement text and extracts general information and transactions.
+    text may also be an iterable of page texts or lines (see BankStatementStream).
+    Returns structured data matching expected schema.
+    """
+    statement = BankStatementStream(text)
+    transactions = list(statement)
 
     return {
         "document_type": "bank_statement",
-        "header": header,
+        "header": statement.header,
         "transactions": transactions
     }
 
 def parse_transaction_line(lines):
     """
     Reconstruct and parse a transaction line from buffered lines.
-    Returns a dictionary with date, description, amount, and type.
+    Returns a dictionary with date, description, amount, type and balance
+    (the column after the amount, when there is one).
     """
     full_line = " ".join(lines)
-    parts = re.split(r'\s{2,}', full_line.strip())
+    parts = COLUMN_GAP_PATTERN.split(full_line.strip())
 
     # Default schema
     transaction = {
         "date": "",
         "description": "",
         "amount": "",
-        "type": ""
+        "type": "",
+        "balance": ""
     }
 
     # Case: full split line with clear parts
@@ -79,14 +193,26 @@ def parse_transaction_line(lines):
 
         transaction["amount"] = amount_str
         transaction["type"] = "credit" if "-" not in amount_str else "debit"
+        if len(parts) >= 4:
+            transaction["balance"] = parts[-1]
 
     else:
         # Fallback: attempt to parse from full_line
-        match = re.match(r"(?P<date>\d{2}[\/\-\.]\d{2}[\/\-\.]\d{2,4})\s+(?P<desc>.+?)\s+(-?[0-9.,]+)", full_line)
+        match = TRANSACTION_FALLBACK_PATTERN.match(full_line)
         if match:
             transaction["date"] = match.group("date")
             transaction["description"] = match.group("desc")
             transaction["amount"] = match.group(3)
             transaction["type"] = "credit" if "-" not in match.group(3) else "debit"
+            transaction["balance"] = match.group("balance") or ""
 
     return transaction
+
+
+def parse_bank_transactions_layout_aware(ocr_pages):
+    """
+    Transactions from the column layout of the word boxes (see
+    parser_bank_layout, imported on first use since it needs numpy).
+    """
+    from parser_bank_layout import parse_bank_transactions_layout_aware as parse_layout
+    return parse_layout(ocr_pages)
@@ -0,0 +1,187 @@
+# parser_bank_layout.py
+#
+# Layout-aware bank statement transactions from OCR word boxes. Kept out of
+# parser_bank so that importing the text parser does not load numpy.
+
+import re
+import numpy as np
+from instrumentation import timed
+from parser_bank import OPENING_BALANCE_PATTERN, parse_amount, settle_type
+from word_boxes import WordBoxes
+
+LINE_TOLERANCE = 8  # Max vertical distance (px) between words on the same line
+
+# Header words per column role; the first role whose keyword is in a header cell wins
+COLUMN_ROLES = {
+    "date": ("date",),
+    "description": ("description", "details", "particulars", "narration", "libellé", "libelle", "opération", "operation"),
+    "debit": ("debit", "débit", "withdrawal", "paid out", "retrait"),
+    "credit": ("credit", "crédit", "deposit", "paid in", "versement"),
+    "amount": ("amount", "montant"),
+    "balance": ("balance", "solde"),
+}
+AMOUNT_ROLES = {"debit", "credit", "amount"}
+LAYOUT_TABLE_END_PATTERN = re.compile(r"end of transactions|closing balance|solde final|nouveau solde|total", re.IGNORECASE)
+DATE_CELL_PATTERN = re.compile(r"\d{1,2}[\/\-\.]\d{1,2}|\d{1,2}\s+[^\W\d_]{3,}")
+
+
+def _header_cells(words, start, end):
+    """Merge the words of one line into cells: (text, left, right) of words closer than a word height apart."""
+    texts, lefts = words["text"][start:end], words["left"][start:end]
+    rights = lefts + words["width"][start:end]
+    gap = np.median(words["height"][start:end])
+    cells = []
+    for text, left, right in zip(texts, lefts, rights):
+        if cells and left - cells[-1][2] < gap:
+            cells[-1] = (cells[-1][0] + " " + text, cells[-1][1], right)
+        else:
+            cells.append((text, left, right))
+    return cells
+
+def _cell_role(text):
+    text = text.lower()
+    return next((role for role, keywords in COLUMN_ROLES.items() if any(k in text for k in keywords)), None)
+
+def find_column_header(words, starts):
+    """
+    Find the transaction table header among the visual lines: a line whose cells
+    name a date column, an amount column (debit, credit or amount) and at least
+    three roles in all. Returns (line number, [(role, left, right)] left to right) or None.
+    """
+    ends = np.append(starts[1:], len(words))
+    for line, (start, end) in enumerate(zip(starts, ends)):
+        if end - start < 3:
+            continue
+        anchors = []
+        for text, left, right in _header_cells(words, start, end):
+            role = _cell_role(text)
+            if role is not None and all(role != taken for taken, _, _ in anchors):
+                anchors.append((role, left, right))
+        roles = {role for role, _, _ in anchors}
+        if "date" in roles and roles & AMOUNT_ROLES and len(roles) >= 3:
+            return line, anchors
+    return None
+
+def column_bands(anchors, lefts, rights):
+    """
+    Column boundaries between adjacent header cells. Each one sits in the middle of
+    the widest x-range between the two header centers that the fewest body words cover,
+    so right-aligned amounts and long descriptions stay in their own column.
+    """
+    coverage = np.zeros(int(max(rights.max(initial=0), anchors[-1][2])) + 2, dtype=np.int64)
+    np.add.at(coverage, lefts.astype(np.int64), 1)
+    np.add.at(coverage, rights.astype(np.int64), -1)
+    coverage = np.cumsum(coverage)
+
+    boundaries = []
+    for (_, a_left, a_right), (_, b_left, b_right) in zip(anchors, anchors[1:]):
+        low, high = int((a_left + a_right) / 2), int((b_left + b_right) / 2)
+        if high - low < 2:
+            boundaries.append((low + high) / 2)
+            continue
+        segment = coverage[low:high]
+        emptiest = np.concatenate(([0], (segment == segment.min()).astype(np.int8), [0]))
+        run_starts, run_ends = np.flatnonzero(np.diff(emptiest) == 1), np.flatnonzero(np.diff(emptiest) == -1)
+        widest = np.argmax(run_ends - run_starts)
+        boundaries.append(low + (run_starts[widest] + run_ends[widest]) / 2)
+    return np.array(boundaries)
+
+def _layout_transaction(cells):
+    debit, credit = cells.get("debit", ""), cells.get("credit", "")
+    if debit or credit:
+        amount, kind = (debit, "debit") if debit else (credit, "credit")
+    else:
+        amount = cells.get("amount", "")
+        kind = ("debit" if "-" in amount else "credit") if amount else ""
+    return {
+        "date": cells.get("date", ""),
+        "description": cells.get("description", ""),
+        "amount": amount,
+        "type": kind,
+        "balance": cells.get("balance", ""),
+    }
+
+@timed()
+def parse_bank_transactions_layout_aware(ocr_pages):
+    """
+    Extract transactions from the word boxes of every page (page results from
+    ocr_engine; pages that were not OCRed may be None). Column bands (date,
+    description, debit, credit, amount, balance) are inferred once per page from
+    the table header and the x-gaps of the words below it; all words are then
+    assigned to a column at once by their x-center. Pages without a repeated
+    header reuse the previous page's bands. Where the running balance (from the
+    opening balance above the table) moved by the amount, it decides debit or
+    credit, since amounts are not always printed under their header.
+    Returns [] when no header is found.
+    """
+    transactions = []
+    roles = boundaries = None
+    opening_balance = None
+
+    for page in ocr_pages:
+        if page is None:
+            continue
+        words = WordBoxes.coerce(page["words"])
+        words = words[words.has_text()]
+        if words.empty:
+            continue
+        words, starts = words.visual_lines(LINE_TOLERANCE)
+
+        header = find_column_header(words, starts)
+        if header is not None:
+            line, anchors = header
+            if roles is None:
+                opening = OPENING_BALANCE_PATTERN.search(" ".join(words["text"][:starts[line]]))
+                opening_balance = parse_amount(opening.group(1)) if opening else None
+            body_start = starts[line + 1] if line + 1 < len(starts) else len(words)
+            roles = [role for role, _, _ in anchors]
+            body = slice(body_start, len(words))
+            boundaries = column_bands(anchors, words["left"][body], words["left"][body] + words["width"][body])
+            first_line = line + 1
+        elif roles is not None:
+            first_line = None  # Continuation page: rows start at the first line with a date
+        else:
+            continue
+
+        # Every word's column in one pass
+        columns = np.searchsorted(boundaries, words["left"] + words["width"] / 2)
+        ends = np.append(starts[1:], len(words))
+        line_tops = np.minimum.reduceat(words["top"], starts)
+        line_bottoms = np.maximum.reduceat(words["top"] + words["height"], starts)
+        max_gap = 2 * np.median(words["height"])  # Farther below the last row = not part of it (e.g. a footer)
+        last_bottom = None
+        closed = False
+        for line in range(len(starts)):
+            if first_line is not None and line < first_line:
+                continue
+            cells = {}
+            for index in range(starts[line], ends[line]):
+                role = roles[columns[index]]
+                cells[role] = cells[role] + " " + words["text"][index] if role in cells else words["text"][index]
+
+            if first_line is None:
+                if not DATE_CELL_PATTERN.search(cells.get("date", "")):
+                    continue
+                first_line = line
+
+            if cells.get("date") and any(cells.get(role) for role in AMOUNT_ROLES | {"balance"}):
+                transactions.append(_layout_transaction(cells))
+                last_bottom = line_bottoms[line]
+            elif LAYOUT_TABLE_END_PATTERN.search(" ".join(cells.values())):
+                closed = True
+                break
+            elif last_bottom is not None and line_tops[line] - last_bottom <= max_gap:
+                # Wrapped description (or amounts printed on the next line)
+                last = transactions[-1]
+                continued = _layout_transaction(cells)
+                last["description"] = " ".join(filter(None, (last["description"], continued["date"], continued["description"])))
+                for key in ("amount", "type", "balance"):
+                    last[key] = last[key] or continued[key]
+                last_bottom = line_bottoms[line]
+        if closed:
+            break
+
+    balance = opening_balance
+    for transaction in transactions:
+        balance = settle_type(transaction, balance)
+    return transactions
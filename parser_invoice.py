@@ -1,52 +1,68 @@
+import os
 import re
-from pdf2image import convert_from_path
-from pytesseract import image_to_data, pytesseract
-from collections import defaultdict
+from ocr_engine import get_ocr_words, ocr_page_data, render_pages, OCR_DPI
+from doc_source import load_source, is_pdf, open_image
+from word_boxes import WordBoxes
+from logger import log_info
+import numpy as np
+from field_rules import INVOICE_RULESET, extract_fields
+from instrumentation import timed
 
 DEBUG = False
+LINE_TOLERANCE = 8  # Max vertical distance (px) between words on the same line
+
+# Line-item table detection
+TABLE_HEADER_KEYWORDS = ["désignation", "designation", "qté", "quantité", "pu", "prix", "montant", "total"]
+TABLE_END_PATTERN = re.compile(r"(total|signature|merci|arrêtée)")
+TABLE_ROW_PATTERN = re.compile(r"\d{1,3}(?:[.,]\d{1,2})?\s+[\d.,]+\s+[\d.,]+")
+
+# Table region re-OCR (edit as needed)
+TABLE_REOCR = os.environ.get("INVOICE_TABLE_REOCR", "0") != "0"
+TABLE_OCR_CONFIG = os.environ.get("INVOICE_TABLE_OCR_CONFIG", "--psm 6")
+TABLE_DPI = int(os.environ.get("INVOICE_TABLE_DPI", "300"))
+TABLE_MARGIN = 10  # px kept around the detected table band
 
 def extract_lines_with_boxes_from_image(image):
-    df = image_to_data(image, output_type=pytesseract.Output.DATAFRAME)
-    df = df.dropna(subset=["text"])
-    df = df[df["text"].str.strip() != ""]
-    lines = defaultdict(list)
-
-    for _, row in df.iterrows():
-        y = row["top"]
-        text = row["text"]
-        line_id = y
-        for key in lines:
-            if abs(key - y) < 8:
-                line_id = key
-                break
-        lines[line_id].append((row["left"], text))
-
-    return ["  ".join(word for _, word in sorted(words, key=lambda x: x[0])) for _, words in sorted(lines.items())]
+    words = get_ocr_words(image)
+    return extract_lines_with_boxes(words)
+
+def extract_lines_with_boxes(words):
+    """Group OCR words (WordBoxes or image_to_data DataFrame) into visual lines ordered left to right."""
+    return [line["text"] for line in extract_line_boxes(words)]
+
+def extract_line_boxes(words):
+    """Like extract_lines_with_boxes, but each line also carries its bounding box."""
+    words = WordBoxes.coerce(words)
+    words = words[words.has_text()]
+    if words.empty:
+        return []
+
+    # Words ordered by visual line, then left to right
+    words, starts = words.visual_lines(LINE_TOLERANCE)
+    tops, lefts, texts = words["top"], words["left"], words["text"]
+    bottoms = tops + words["height"]
+    rights = lefts + words["width"]
+
+    return [
+        {"text": "  ".join(words), "top": int(top), "bottom": int(bottom), "left": int(left), "right": int(right)}
+        for words, top, bottom, left, right in zip(
+            np.split(texts, starts[1:]),
+            np.minimum.reduceat(tops, starts),
+            np.maximum.reduceat(bottoms, starts),
+            np.minimum.reduceat(lefts, starts),
+            np.maximum.reduceat(rights, starts),
+        )
+    ]
 
 def extract_field(pattern, text, group=1, fallback="N/A"):
     match = re.search(pattern, text, re.IGNORECASE)
     return match.group(group).strip() if match else fallback
 
+@timed()
 def parse_invoice(text):
     text = re.sub(r"\s+", " ", text)  # Normalize whitespace
 
-    header = {
-        "invoice_number": extract_field(r"(facture|invoice)\s*(n°|no|numéro)?\s*[:\-]?\s*([A-Za-z0-9\/\-]+)", text, 3),
-        "invoice_date": extract_field(r"(date\s*facture|casablanca le|date)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", text, 2),
-        "delivery_date": extract_field(r"(livraison\s*le|delivery\s*date)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", text, 2),
-        "due_date": extract_field(r"(echeance|due\s*date)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})", text, 2),
-        "client_name": extract_field(r"client\s*[:\-]?\s*([A-Z0-9\s\-]+)", text, 1),
-        "client_ice_or_if": extract_field(r"(ice|if)\s*(client)?\s*[:\-]?\s*(\d+)", text, 3),
-        "provider_name": extract_field(r"(fourni\w*|issuer|from)\s*[:\-]?\s*([A-Z][a-zA-Z\s&]+)", text, 2),
-        "provider_ice_or_if": extract_field(r"(ice|if)\s*(fournisseur|provider)?\s*[:\-]?\s*(\d+)", text, 3),
-        "sub_total_ht": extract_field(r"(sous\s*total\s*ht|sub\s*total)\s*[:\-]?\s*([\d\., ]+)", text, 2),
-        "vat_amount": extract_field(r"(montant\s*tva|vat\s*amount)\s*[:\-]?\s*([\d\., ]+)", text, 2),
-        "vat_percent": extract_field(r"tva\s*[:\-]?\s*(\d{1,2})\s*%", text, 1),
-        "total_ttc": extract_field(r"(total\s*ttc|total\s*amount)\s*[:\-]?\s*([\d\., ]+)", text, 2),
-        "discount": extract_field(r"(remise|discount)\s*[:\-]?\s*([\d\.,]+)", text, 2),
-        "delivery_fee": extract_field(r"(livraison|delivery\s*fee)\s*[:\-]?\s*([\d\.,]+)", text, 2),
-        "other_charges": extract_field(r"(frais divers|other charges)\s*[:\-]?\s*([\d\.,]+)", text, 2)
-    }
+    header = extract_fields(INVOICE_RULESET, text)
 
     # Fallback for invoice_date if not found
     if header["invoice_date"] == "N/A":
@@ -58,40 +74,129 @@ def parse_invoice(text):
         "transactions": []  # Populated separately
     }
 
-def parse_transactions_layout_aware(pdf_path, poppler_path=None):
-    images = convert_from_path(pdf_path, first_page=1, last_page=1, poppler_path=poppler_path)
-    if not images:
-        return []
+def find_table_header(lines):
+    """Index of the first line that looks like the line-item table header, or -1."""
+    for i, line in enumerate(lines):
+        text = line["text"].lower()
+        if sum(1 for k in TABLE_HEADER_KEYWORDS if k in text) >= 3:
+            return i
+    return -1
+
+def locate_table_lines(lines, continuation=False):
+    """
+    Find the table body on one page: returns (start, end, closed) line indexes,
+    or None when the page has no table. On continuation pages the body starts
+    after a repeated header, or at the first item row when the header is not repeated.
+    closed is True when the table ends on this page.
+    """
+    header = find_table_header(lines)
+    if header != -1:
+        start = header + 1
+    elif continuation:
+        start = next((i for i, line in enumerate(lines) if TABLE_ROW_PATTERN.search(line["text"])), len(lines))
+    else:
+        return None
+
+    for end in range(start, len(lines)):
+        l_clean = lines[end]["text"].strip().lower()
+        if not l_clean or TABLE_END_PATTERN.search(l_clean):
+            return start, end, True
+    return start, len(lines), False
+
+def _load_page_image(source_path, page_index, poppler_path=None):
+    """Page image for table re-OCR plus the factor from page-word coordinates to its pixels."""
+    if is_pdf(source_path):
+        images = render_pages(source_path, page_index + 1, page_index + 1, dpi=TABLE_DPI, poppler_path=poppler_path)
+        return images[0], TABLE_DPI / OCR_DPI
+    return open_image(source_path), 1.0
+
+def reocr_table_region(source_path, page_index, lines, start, end, poppler_path=None):
+    """
+    Re-OCR only the table band (header line through the last body line) with
+    table-tuned Tesseract settings. Returns the band's lines in page coordinates.
+    """
+    region = lines[max(start - 1, 0):end]
+    image, factor = _load_page_image(source_path, page_index, poppler_path)
+
+    box = (
+        max(0, int((min(l["left"] for l in region) - TABLE_MARGIN) * factor)),
+        max(0, int((min(l["top"] for l in region) - TABLE_MARGIN) * factor)),
+        min(image.width, int((max(l["right"] for l in region) + TABLE_MARGIN) * factor)),
+        min(image.height, int((max(l["bottom"] for l in region) + TABLE_MARGIN) * factor)),
+    )
+    crop = image.crop(box)
+    crop_pixels = crop.width * crop.height
+    log_info(
+        f"Table re-OCR on page {page_index + 1}: {crop.width}x{crop.height} of {image.width}x{image.height} "
+        f"({crop_pixels / (image.width * image.height):.0%} of the page pixels)"
+    )
+
+    # Not normalized: rescaling toward OCR_TARGET_TEXT_HEIGHT would undo the TABLE_DPI render
+    words = ocr_page_data(crop, config=TABLE_OCR_CONFIG, normalize=False)["words"]
+    words = words.assign(
+        left=(words["left"] + box[0]) / factor,
+        top=(words["top"] + box[1]) / factor,
+        width=words["width"] / factor,
+        height=words["height"] / factor,
+    )
+    return extract_line_boxes(words)
+
+@timed()
+def parse_transactions_layout_aware(pdf_path, poppler_path=None, words=None, ocr_pages=None, reocr=None):
+    """
+    Extract invoice line items from the page layout of pdf_path (a path, bytes
+    or file-like object; only read when pages have to be rasterized).
+    Pass ocr_pages (page results from ocr_engine) to reuse an existing OCR pass;
+    the table may then continue across pages. words is the page-1 words only.
+    With neither, page 1 is rasterized and OCRed here.
+    With reocr (default INVOICE_TABLE_REOCR), only the detected table band of
+    each OCRed page is OCRed again with table settings at TABLE_DPI.
+    """
+    reocr = TABLE_REOCR if reocr is None else reocr
+    pdf_path = load_source(pdf_path)
+    if ocr_pages is None:
+        if words is None:
+            images = render_pages(pdf_path, 1, 1, poppler_path=poppler_path)
+            if not images:
+                return []
+            words = get_ocr_words(images[0])
+        ocr_pages = [{"words": words}]
+
+    # Locate transactions block by detecting headers, following it onto later pages
+    lines = []
+    in_table = False
+    for page_index, page in enumerate(ocr_pages):
+        if page is None:  # Not OCRed (progressive OCR skipped it)
+            continue
+        page_lines = extract_line_boxes(page["words"])
+        span = locate_table_lines(page_lines, continuation=in_table)
+        if span is None:
+            continue
+
+        start, end, closed = span
+        if reocr and end > start and page.get("source") != "text_layer":
+            band_lines = reocr_table_region(pdf_path, page_index, page_lines, start, end, poppler_path)
+            band_span = locate_table_lines(band_lines, continuation=True)
+            if band_span and band_span[1] > band_span[0]:
+                page_lines, (start, end, _) = band_lines, band_span
+
+        lines.extend(line["text"] for line in page_lines[start:end])
+        in_table = True
+        if closed:
+            break
 
-    lines = extract_lines_with_boxes_from_image(images[0])
     if DEBUG:
-        print("\n--- OCR LINES ---")
+        print("\n--- TABLE LINES ---")
         for i, l in enumerate(lines): print(f"{i+1:02d}: {l}")
 
-    # Locate transactions block by detecting headers
-    header_keywords = ["désignation", "designation", "qté", "quantité", "pu", "prix", "montant", "total"]
-    header_line_idx = -1
-
-    for i in range(len(lines)):
-        line = lines[i].lower()
-        if sum(1 for k in header_keywords if k in line) >= 3:
-            header_line_idx = i + 1
-            break
-
-    if header_line_idx == -1:
+    if not in_table:
         return []
 
     # Gather transaction lines
     buffer = []
     current_line = []
-    for line in lines[header_line_idx:]:
-        l_clean = line.strip().lower()
-        if not l_clean or re.search(r"(total|signature|merci|arrêtée)", l_clean):
-            if current_line:
-                buffer.append(" ".join(current_line))
-            break
-
-        if re.search(r"\d{1,3}(?:[.,]\d{1,2})?\s+[\d.,]+\s+[\d.,]+", line):
+    for line in lines:
+        if TABLE_ROW_PATTERN.search(line):
             if current_line:
                 buffer.append(" ".join(current_line))
             current_line = [line]
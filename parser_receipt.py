@@ -1,6 +1,9 @@
 import re
-from utils import clean_text, extract_match, format_currency
+from utils import clean_text, format_currency
+from field_rules import RECEIPT_RULESET, extract_fields
+from instrumentation import timed
 
+@timed()
 def parse_receipt(text):
     """
     Extract structured fields from a receipt OCR'd text.
@@ -10,18 +13,9 @@ def parse_receipt(text):
     lines = text.split("\n")
 
     # --- Header Info ---
-    header = {
-        "document_type": "receipt",
-        "receipt_number": extract_match(r"(receipt|ticket|invoice)\s*#?[:\-]?\s*([A-Za-z0-9\-/]+)", text, 2),
-        "date": extract_match(r"(date)\s*[:\-]?\s*(\d{1,2}[\/\.\-]\d{1,2}[\/\.\-]\d{2,4})", text, 2),
-        "time": extract_match(r"(time)\s*[:\-]?\s*(\d{1,2}:\d{2}(?:\s*[APMapm]{2})?)", text, 2),
-        "shop_name": extract_match(r"^(.*(?:store|mart|shop|restaurant|bakery|pharmacy))", text, 1),
-        "address": extract_match(r"(address)\s*[:\-]?\s*(.+?)(?=\s{2,}|date|time|phone|$)", text, 2),
-        "total_amount_paid": format_currency(
-            extract_match(r"(total\s*(amount)?\s*(paid)?|grand\s*total)\s*[:\-]?\s*([0-9.,]+)", text, 4)
-        ),
-        "payment_method": extract_match(r"(payment\s*method|paid\s*by)\s*[:\-]?\s*(cash|card|credit|debit)", text, 2),
-    }
+    fields = extract_fields(RECEIPT_RULESET, text)
+    fields["total_amount_paid"] = format_currency(fields["total_amount_paid"])
+    header = {"document_type": "receipt", **fields}
 
     # --- Transactions / Items ---
     items = []
@@ -0,0 +1,107 @@
+# pdf_text.py
+
+import importlib.util
+import os
+from PIL import Image
+from doc_source import is_path
+from word_boxes import WordBoxes
+
+# Optional: PyMuPDF enables the born-digital PDF fast path. It is imported
+# on first use, since the import alone is slow.
+PYMUPDF_INSTALLED = importlib.util.find_spec("pymupdf") is not None
+
+# Text-layer settings (edit as needed)
+PDF_TEXT_LAYER = os.environ.get("PDF_TEXT_LAYER", "1") != "0"
+MIN_TEXT_LAYER_WORDS = int(os.environ.get("MIN_TEXT_LAYER_WORDS", "5"))   # Fewer words = treat page as scanned
+MIN_TEXT_LAYER_QUALITY = 0.6  # Share of words that must contain letters or digits
+# Pages mostly covered by images are scans: their text layer only counts when its
+# words cover MIN_TEXT_LAYER_COVERAGE of the page (a searchable PDF), not a stamp or page number
+SCANNED_IMAGE_COVERAGE = float(os.environ.get("SCANNED_IMAGE_COVERAGE", "0.5"))
+MIN_TEXT_LAYER_COVERAGE = float(os.environ.get("MIN_TEXT_LAYER_COVERAGE", "0.02"))
+
+
+def text_layer_available():
+    return PYMUPDF_INSTALLED and PDF_TEXT_LAYER
+
+def open_pdf(source):
+    """Open a PDF path or PDF bytes with PyMuPDF (bytes are read from memory)."""
+    import pymupdf
+    return pymupdf.open(source) if is_path(source) else pymupdf.open(stream=source, filetype="pdf")
+
+def pdf_page_count(source):
+    with open_pdf(source) as doc:
+        return doc.page_count
+
+def render_pdf_pages(source, first_page, last_page, dpi):
+    """Rasterize pages first_page..last_page (1-based) to RGB PIL images in memory."""
+    images = []
+    with open_pdf(source) as doc:
+        for page_index in range(first_page - 1, last_page):
+            pixmap = doc[page_index].get_pixmap(dpi=dpi)
+            images.append(Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples))
+    return images
+
+def page_coverage(page, words):
+    """Shares of a PyMuPDF page's area covered by the words' boxes and by images."""
+    import pymupdf
+    area = abs(page.rect) or 1
+    text_area = sum((w[2] - w[0]) * (w[3] - w[1]) for w in words)
+    image_area = sum(abs(pymupdf.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return text_area / area, image_area / area
+
+def is_usable_text_layer(words, page=None):
+    """
+    A page counts as born-digital when it has enough real words (not glyph garbage).
+    With page given, a page covered by a scanned image also needs its words to
+    cover a meaningful share of the page, or the image is OCRed.
+    """
+    if len(words) < MIN_TEXT_LAYER_WORDS:
+        return False
+    readable = sum(1 for w in words if any(ch.isalnum() for ch in w[4]))
+    if readable / len(words) < MIN_TEXT_LAYER_QUALITY:
+        return False
+    if page is not None:
+        text_share, image_share = page_coverage(page, words)
+        if image_share >= SCANNED_IMAGE_COVERAGE and text_share < MIN_TEXT_LAYER_COVERAGE:
+            return False
+    return True
+
+def text_layer_words(words, page_num, scale):
+    """
+    Convert PyMuPDF words (x0, y0, x1, y1, text, block, line, word) into the same
+    columns image_to_data produces, in pixels at the OCR DPI (scale = dpi / 72).
+    """
+    return WordBoxes.from_columns({
+        "level": [5] * len(words),
+        "page_num": [page_num] * len(words),
+        "block_num": [w[5] + 1 for w in words],
+        "par_num": [1] * len(words),
+        "line_num": [w[6] + 1 for w in words],
+        "word_num": [w[7] + 1 for w in words],
+        "left": [round(w[0] * scale) for w in words],
+        "top": [round(w[1] * scale) for w in words],
+        "width": [round((w[2] - w[0]) * scale) for w in words],
+        "height": [round((w[3] - w[1]) * scale) for w in words],
+        "conf": [100.0] * len(words),
+        "text": [w[4] for w in words],
+    })
+
+def extract_pdf_text_layer(source, dpi, page_indexes=None):
+    """
+    Read words with coordinates straight from the PDF text layer (path or bytes).
+    Returns one entry per page: the page's WordBoxes, or None for pages that
+    need OCR (scanned pages) and pages not in page_indexes (0-based, default all).
+    Returns None when PyMuPDF is not installed.
+    """
+    if not text_layer_available():
+        return None
+
+    scale = dpi / 72
+    with open_pdf(source) as doc:
+        pages = [None] * doc.page_count
+        for page_index in range(doc.page_count) if page_indexes is None else page_indexes:
+            page = doc[page_index]
+            words = [w for w in page.get_text("words", sort=True) if w[4].strip()]
+            if is_usable_text_layer(words, page):
+                pages[page_index] = text_layer_words(words, page_index + 1, scale)
+    return pages
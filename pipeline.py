@@ -0,0 +1,290 @@
+# pipeline.py
+#
+# Library API: OCR -> classification -> parsing -> output schema as one
+# reusable object that keeps its warm state between documents.
+#
+#   from pipeline import Pipeline
+#   with Pipeline(ocr_workers=4) as pipeline:
+#       result = pipeline.process("invoice.pdf")
+#       for result in pipeline.process_many(["a.pdf", "b.png"], workers=2):
+#           print(result.source, result.document_type, result.error)
+
+import importlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+from doc_source import load_source, is_path, is_pdf, source_name
+from instrumentation import run, summarize_run
+from logger import log_info, log_error
+from utils import build_output_schema
+
+# Progressive OCR (edit as needed): page 1 of a PDF is classified as soon as it
+# is OCRed, while the pool already works on the next pages. When the classifier is
+# at least CLASSIFY_CONFIDENCE sure, the type's page plan applies; otherwise the
+# whole text is classified once every page is OCRed.
+PROGRESSIVE_OCR = os.environ.get("PROGRESSIVE_OCR", "1") != "0"
+CLASSIFY_CONFIDENCE = float(os.environ.get("CLASSIFY_CONFIDENCE", "0.6"))
+
+# Pages OCRed after page 1 per document type ("all", "first" or "first_last")
+# and the Tesseract options used for them (None = OCR_CONFIG). Every parser reads
+# all pages (line items, receipt items and transactions continue onto middle
+# pages), so the defaults keep them all; narrow a plan only for a parser that
+# provably ignores the other pages.
+PAGE_PLANS = {
+    "invoice": {"pages": "all", "config": None},
+    "receipt": {"pages": "all", "config": None},
+    "bank_statement": {"pages": "all", "config": None},
+}
+
+# Parser module per document type: (module, text parser, layout parser or None).
+# A module is imported the first time a document of its type is parsed.
+PARSERS = {
+    "invoice": ("parser_invoice", "parse_invoice", "parse_transactions_layout_aware"),
+    "receipt": ("parser_receipt", "parse_receipt", None),
+    "bank_statement": ("parser_bank", "parse_bank_statement", "parse_bank_transactions_layout_aware"),
+}
+
+
+@dataclass
+class DocumentResult:
+    """Outcome of one document; error is set when processing failed."""
+    source: str                              # File path, or the name given for in-memory input
+    document_type: Optional[str] = None      # invoice | receipt | bank_statement | unknown
+    output: Optional[dict] = None            # Output schema (document_type, metadata, fields, transactions)
+    text: str = ""                           # OCR text of all pages
+    pages: int = 0
+    seconds: float = 0.0
+    timings: dict = field(default_factory=dict)  # Self time in ms per pipeline stage
+    error: Optional[str] = None              # "ExceptionType: message"
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class Pipeline:
+    """
+    Runs documents through OCR, classification and parsing while keeping the
+    OCR backend (resident engines with tesserocr), the compiled field rules,
+    the parsers (each imported with the first document of its type, see
+    PARSERS) and, with ocr_workers > 1, a page OCR process pool alive
+    across calls. OCR settings come from the usual environment variables;
+    preload_ocr loads the OCR backend up front (long-running services);
+    progressive (default PROGRESSIVE_OCR) classifies PDFs from page 1 first.
+    """
+
+    def __init__(self, ocr_workers=None, poppler_path=None, preload_ocr=False, progressive=None):
+        from ocr_backends import get_ocr_backend
+        from ocr_engine import OCR_WORKERS, POPPLER_PATH
+
+        # The backend is process-wide; preload_ocr starts it now instead of on the first scanned page
+        self.backend = get_ocr_backend() if preload_ocr else None
+        self.poppler_path = poppler_path or POPPLER_PATH
+        self._parsers = {}
+        self._parsers_lock = threading.Lock()
+
+        self.progressive = PROGRESSIVE_OCR if progressive is None else progressive
+        self.ocr_workers = OCR_WORKERS if ocr_workers is None else ocr_workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _page_pool(self):
+        """Process pool for page OCR, started with the first scanned PDF and kept until close()."""
+        if self.ocr_workers <= 1:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.ocr_workers)
+            return self._pool
+
+    def parsers_for(self, document_type):
+        """(text parser, layout parser or None) for a document type, imported on first use and kept."""
+        with self._parsers_lock:
+            if document_type not in self._parsers:
+                module_name, parse_name, layout_name = PARSERS[document_type]
+                module = importlib.import_module(module_name)
+                self._parsers[document_type] = (getattr(module, parse_name), getattr(module, layout_name) if layout_name else None)
+            return self._parsers[document_type]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def process(self, source, name=None, ocr_pages=None, raise_errors=False):
+        """
+        Process one document given as a path, bytes or binary file-like object.
+        name labels in-memory input; ocr_pages (page results from ocr_engine)
+        skips OCR. Failures are reported in result.error, or raised with raise_errors.
+        """
+        source = load_source(source)
+        label = source_name(source, name)
+        result = DocumentResult(source=label)
+        start = time.perf_counter()
+
+        with run(label) as current_run:
+            first_record = len(current_run["records"]) if current_run else 0
+            try:
+                self._process(source, name, ocr_pages, result)
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {str(e)}"
+                if raise_errors:
+                    raise
+                log_error(f"[FR06] Processing failed for {label}: {result.error}")
+            finally:
+                result.seconds = round(time.perf_counter() - start, 3)
+                if current_run:
+                    records = {**current_run, "records": current_run["records"][first_record:]}
+                    stages = summarize_run(records, result.seconds)["stages"]
+                    result.timings = {stage_name: s["self_ms"] for stage_name, s in stages.items()}
+        return result
+
+    def process_many(self, sources, workers=1):
+        """
+        Process an iterable of sources (or (source, name) pairs) and yield one
+        DocumentResult per item, in input order. With workers > 1 documents
+        overlap on threads (OCR runs in Tesseract, outside the GIL); at most
+        2 * workers documents are read ahead.
+        """
+        items = ((item if isinstance(item, tuple) else (item, None)) for item in sources)
+        if workers <= 1:
+            for source, name in items:
+                yield self.process(source, name)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline") as executor:
+            pending = deque()
+            for source, name in items:
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(self.process, source, name))
+            while pending:
+                yield pending.popleft().result()
+
+    def _process(self, source, name, ocr_pages, result):
+        from ocr_engine import perform_ocr_on_image_with_data, ocr_result_text
+        from doc_classifier import identify_document_type
+
+        file_path = result.source
+        if ocr_pages is None and is_path(source) and not os.path.exists(source):
+            raise FileNotFoundError(source)
+
+        # OCR (progressive PDFs come back already classified)
+        document_type = None
+        if ocr_pages is not None:
+            log_info(f"Using existing OCR result for: {file_path}")
+        elif is_pdf(source, name):
+            log_info(f"Processing PDF: {file_path}")
+            ocr_pages, document_type = self._ocr_pdf(source, file_path)
+        else:
+            log_info(f"Processing Image: {file_path}")
+            ocr_pages = perform_ocr_on_image_with_data(source)
+
+        # One OCR pass feeds classification, the text parsers and the layout parser
+        result.pages = len(ocr_pages)
+        result.text = text = ocr_result_text(ocr_pages)
+
+        # Classification
+        result.document_type = document_type = document_type or identify_document_type(text)
+        log_info(f"Identified document type: {document_type} for file: {file_path}")
+        if document_type not in PARSERS:
+            log_error(f"[FR06] Failed to identify document type for: {file_path}")
+            raise ValueError("Unknown document type")
+
+        log_info(f"Starting {document_type.replace('_', ' ')} parsing for: {file_path}")
+        parse, parse_layout = self.parsers_for(document_type)
+        extracted_data = parse(text)
+
+        if document_type == "invoice":
+            # Layout-aware parser call (reuses the OCR words of every page)
+            layout_transactions = parse_layout(source, poppler_path=self.poppler_path, ocr_pages=ocr_pages)
+            if layout_transactions:
+                log_info(f"Enhanced transactions extracted using layout-aware OCR for: {file_path}")
+                extracted_data["transactions"] = layout_transactions
+        elif document_type == "bank_statement":
+            # Column bands from the word boxes of every page
+            layout_transactions = parse_layout(ocr_pages)
+            if layout_transactions:
+                log_info(f"Statement transactions extracted from the column layout for: {file_path}")
+                extracted_data["transactions"] = layout_transactions
+
+        fields = {k: v for k, v in extracted_data.items() if k != "transactions"}
+        transactions = extracted_data.get("transactions", [])
+        result.output = build_output_schema(document_type, file_path, fields, transactions)
+
+    def _ocr_pdf(self, source, file_path):
+        """
+        OCR a PDF. Returns (page results, document type), where the type is None
+        when the whole text still has to be classified. Pages left out by a
+        page plan are None in the page results.
+        """
+        from ocr_cache import OCR_CACHE_ENABLED, content_sha256
+        from ocr_engine import stream_pdf_page_data
+        from doc_classifier import classify_with_confidence
+
+        content_hash = content_sha256(source) if OCR_CACHE_ENABLED else None  # Hashed once for every cache lookup
+
+        def ocr(page_indexes=None, config=None):
+            return stream_pdf_page_data(source, workers=self.ocr_workers, pool=self._page_pool(),
+                                        page_indexes=page_indexes, config=config, content_hash=content_hash)
+
+        # All pages go to the pool at once; page 1 comes back first
+        page_count, stream = ocr()
+        pages = [None] * page_count
+        document_type = None
+        if self.progressive and page_count > 1:
+            _, pages[0] = next(stream)
+            document_type, confidence = classify_with_confidence(pages[0]["text"])
+            plan = PAGE_PLANS.get(document_type)
+            if plan is None or confidence < CLASSIFY_CONFIDENCE:
+                log_info(f"Page 1 of {file_path} looks like {document_type} ({confidence:.2f} < {CLASSIFY_CONFIDENCE}): classifying all {page_count} pages")
+                document_type = None
+            else:
+                indexes = plan_pages(plan["pages"], page_count)
+                log_info(f"Page 1 of {file_path} classified as {document_type} ({confidence:.2f}): OCRing {len(indexes)} more of {page_count} pages")
+                if plan["config"] is not None or len(indexes) < page_count - 1:
+                    # The plan changes the work: stop the running pass (pages not started are
+                    # cancelled) and OCR the planned pages with the plan's settings
+                    stream.close()
+                    _, stream = ocr(page_indexes=indexes, config=plan["config"])
+
+        for index, page in stream:
+            pages[index] = page
+        return pages, document_type
+
+
+def plan_pages(plan, page_count):
+    """0-based pages after page 1 that a page plan ("all", "first" or "first_last") OCRs."""
+    if plan == "all":
+        return list(range(1, page_count))
+    if plan == "first_last":
+        return [page_count - 1] if page_count > 1 else []
+    if plan == "first":
+        return []
+    raise ValueError(f"Unknown page plan: {plan}")
+
+
+_default_pipeline = None
+_default_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """The process-wide Pipeline used by main.process_document (created on first use)."""
+    global _default_pipeline
+    with _default_pipeline_lock:
+        if _default_pipeline is None:
+            _default_pipeline = Pipeline()
+        return _default_pipeline
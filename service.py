@@ -0,0 +1,185 @@
+# service.py
+#
+# Asynchronous HTTP extraction service.
+# Run: python service.py  (then POST a file to http://localhost:8080/jobs)
+#
+#   POST /jobs               multipart upload (field "file") or raw body with ?filename=...
+#   GET  /jobs/{id}          job status
+#   GET  /jobs/{id}/result   extracted JSON once the job is done
+#   GET  /health             queue and worker status
+
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from aiohttp import web
+from logger import log_info, log_error
+
+# Service settings (edit as needed)
+SERVICE_HOST = os.environ.get("SERVICE_HOST", "0.0.0.0")
+SERVICE_PORT = int(os.environ.get("SERVICE_PORT", "8080"))
+SERVICE_WORKERS = int(os.environ.get("SERVICE_WORKERS", str(os.cpu_count() or 1)))
+SERVICE_MAX_QUEUE = int(os.environ.get("SERVICE_MAX_QUEUE", "32"))       # Queued jobs before uploads are refused
+SERVICE_MAX_UPLOAD_MB = int(os.environ.get("SERVICE_MAX_UPLOAD_MB", "25"))
+SERVICE_JOB_TTL = int(os.environ.get("SERVICE_JOB_TTL", "3600"))         # Seconds finished jobs stay available
+
+SUPPORTED_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg")
+
+
+def run_job(file_path, filename=None):
+    """
+    Worker-side job: OCR, classify and parse one spooled upload. filename (the
+    uploaded name) labels logs and the output's metadata.source_file.
+    """
+    # Imported here so the heavy OCR stack loads once per worker process
+    from main import process_document
+
+    start = time.perf_counter()
+    try:
+        document_type, output_data = process_document(file_path, name=filename)
+    except Exception as e:
+        # Some library exceptions cannot be unpickled in the parent and would break the pool
+        raise RuntimeError(f"{type(e).__name__}: {str(e)}") from None
+    return document_type, output_data, round(time.perf_counter() - start, 3)
+
+async def job_worker(app):
+    queue = app["queue"]
+    loop = asyncio.get_running_loop()
+    while True:
+        job_id = await queue.get()
+        job = app["jobs"].get(job_id)
+        try:
+            if job is None:
+                continue
+            job["status"] = "running"
+            document_type, output_data, seconds = await loop.run_in_executor(app["pool"], run_job, job["path"], job["filename"])
+            job.update(status="done", document_type=document_type, result=output_data, seconds=seconds)
+            log_info(f"[Service] Job {job_id} done: {document_type} in {seconds}s")
+        except Exception as e:
+            job.update(status="error", error=str(e) if isinstance(e, RuntimeError) else f"{type(e).__name__}: {str(e)}")
+            log_error(f"[FR06] Job {job_id} failed for {job['filename']}: {str(e)}")
+        finally:
+            if job is not None:
+                job["finished_at"] = time.time()
+                _remove_upload(job.pop("path", None))
+            queue.task_done()
+
+async def prune_jobs(app):
+    """Drop finished jobs older than SERVICE_JOB_TTL."""
+    while True:
+        await asyncio.sleep(60)
+        cutoff = time.time() - SERVICE_JOB_TTL
+        expired = [job_id for job_id, job in app["jobs"].items() if job.get("finished_at", cutoff + 1) < cutoff]
+        for job_id in expired:
+            del app["jobs"][job_id]
+
+def _remove_upload(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def _job_status(job_id, job):
+    status = {key: job.get(key) for key in ("status", "filename", "document_type", "seconds", "error")}
+    status["job_id"] = job_id
+    return status
+
+async def _read_upload(request):
+    """Return (filename, bytes) from a multipart "file" field or a raw request body."""
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == "file":
+                return part.filename or "upload", await part.read()
+        raise web.HTTPBadRequest(text="Multipart upload needs a 'file' field")
+    return request.query.get("filename", "upload"), await request.read()
+
+async def submit_job(request):
+    app = request.app
+    # Refuse before reading the body so bursts cannot pile uploads up in memory
+    if app["queue"].full():
+        raise web.HTTPServiceUnavailable(text="Job queue is full, retry later", headers={"Retry-After": "5"})
+
+    filename, data = await _read_upload(request)
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise web.HTTPUnsupportedMediaType(text=f"Unsupported file type: {ext or 'none'}")
+    if not data:
+        raise web.HTTPBadRequest(text="Empty upload")
+
+    fd, path = tempfile.mkstemp(suffix=ext, dir=app["upload_dir"])
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+
+    job_id = uuid.uuid4().hex
+    app["jobs"][job_id] = {"status": "queued", "filename": filename, "path": path, "submitted_at": time.time()}
+    try:
+        app["queue"].put_nowait(job_id)
+    except asyncio.QueueFull:
+        del app["jobs"][job_id]
+        _remove_upload(path)
+        raise web.HTTPServiceUnavailable(text="Job queue is full, retry later", headers={"Retry-After": "5"})
+
+    log_info(f"[Service] Job {job_id} queued for {filename}")
+    return web.json_response({"job_id": job_id, "status": "queued"}, status=202,
+                             headers={"Location": f"/jobs/{job_id}"})
+
+def _get_job(request):
+    job_id = request.match_info["job_id"]
+    job = request.app["jobs"].get(job_id)
+    if job is None:
+        raise web.HTTPNotFound(text=f"Unknown job: {job_id}")
+    return job_id, job
+
+async def get_job(request):
+    job_id, job = _get_job(request)
+    return web.json_response(_job_status(job_id, job))
+
+async def get_job_result(request):
+    job_id, job = _get_job(request)
+    if job["status"] == "done":
+        return web.json_response(job["result"])
+    if job["status"] == "error":
+        return web.json_response(_job_status(job_id, job), status=422)
+    return web.json_response(_job_status(job_id, job), status=202)
+
+async def health(request):
+    app = request.app
+    return web.json_response({
+        "queued": app["queue"].qsize(),
+        "max_queue": SERVICE_MAX_QUEUE,
+        "workers": SERVICE_WORKERS,
+        "jobs": len(app["jobs"]),
+    })
+
+async def on_startup(app):
+    app["tasks"] = [asyncio.create_task(job_worker(app)) for _ in range(SERVICE_WORKERS)]
+    app["tasks"].append(asyncio.create_task(prune_jobs(app)))
+
+async def on_cleanup(app):
+    for task in app["tasks"]:
+        task.cancel()
+    await asyncio.gather(*app["tasks"], return_exceptions=True)
+    app["pool"].shutdown(cancel_futures=True)
+    app["upload_tmp"].cleanup()
+
+def create_app():
+    app = web.Application(client_max_size=SERVICE_MAX_UPLOAD_MB * 1024 * 1024)
+    app["queue"] = asyncio.Queue(maxsize=SERVICE_MAX_QUEUE)
+    app["jobs"] = {}
+    app["pool"] = ProcessPoolExecutor(max_workers=SERVICE_WORKERS)
+    app["upload_tmp"] = tempfile.TemporaryDirectory(prefix="ocr_uploads_")
+    app["upload_dir"] = app["upload_tmp"].name
+
+    app.router.add_post("/jobs", submit_job)
+    app.router.add_get("/jobs/{job_id}", get_job)
+    app.router.add_get("/jobs/{job_id}/result", get_job_result)
+    app.router.add_get("/health", health)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+if __name__ == "__main__":
+    log_info(f"[Service] Starting on {SERVICE_HOST}:{SERVICE_PORT} with {SERVICE_WORKERS} workers")
+    web.run_app(create_app(), host=SERVICE_HOST, port=SERVICE_PORT)
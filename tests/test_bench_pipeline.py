@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_pipeline import compare
+
+
+def stage(docs=2, p50=1.0, p90=2.0, mem=1.0):
+    return {"docs": docs, "pages": docs, "p50_ms": p50, "p90_ms": p90, "p99_ms": p90, "peak_mem_mb": mem}
+
+
+def test_compare_flags_slower_stages():
+    baseline = {"stages": {"parse_invoice": stage()}}
+    current = {"stages": {"parse_invoice": stage(p50=2.0)}}
+    assert compare(baseline, current, 0.15) == [("parse_invoice", "p50_ms", 1.0, 2.0)]
+    assert compare(baseline, current, 0.15, min_delta_ms=1.0) == []
+
+
+def test_compare_flags_missing_stages_and_documents():
+    baseline = {"stages": {"classify": stage(docs=7), "layout_bank_statement": stage()}}
+    current = {"stages": {"classify": stage(docs=6)}}
+    assert compare(baseline, current, 0.15) == [("classify", "docs", 7, 6), ("layout_bank_statement", "docs", 2, 0)]
+
+
+def test_compare_fails_an_empty_run():
+    baseline = {"stages": {"pipeline": stage()}}
+    assert compare(baseline, {"stages": {}}, 0.15) == [("pipeline", "docs", 2, 0)]
@@ -0,0 +1,79 @@
+import json
+import random
+
+import pytest
+
+import doc_classifier
+from doc_classifier import KEYWORD_GROUPS, STRONG_INDICATORS, KeywordClassifier
+
+
+def legacy_document_type(text):
+    """identify_document_type before the single-pass matcher: one `in` test per keyword."""
+    text_lower = text.lower()
+    for doc_type, anchor, keywords in STRONG_INDICATORS:
+        if anchor in text_lower and any(k in text_lower for k in keywords):
+            return doc_type
+    score = {doc_type: sum(k in text_lower for k in keywords) for doc_type, keywords in KEYWORD_GROUPS.items()}
+    best_match = max(score, key=score.get)
+    return best_match if score[best_match] > 0 else "unknown"
+
+
+FRAGMENTS = sorted({kw for _, anchor, kws in STRONG_INDICATORS for kw in (anchor, *kws)} | {kw for kws in KEYWORD_GROUPS.values() for kw in kws})
+FRAGMENTS += ["INVOICE", "Bank", "statement", "Receipt", "cred", "it", "no", "total", "ttc", "tax", "date", "x", "\n", " ", "", "ri", "b"]
+
+
+@pytest.fixture
+def classifier():
+    return KeywordClassifier(STRONG_INDICATORS, KEYWORD_GROUPS)
+
+
+@pytest.mark.parametrize("text, doc_type", [
+    ("", "unknown"),
+    ("Hello world", "unknown"),
+    ("RECEIPT\nPayment Method: Card", "receipt"),
+    ("Invoice No 12\nClient Info", "invoice"),
+    ("Bank Statement\nRIB 123\nSolde", "bank_statement"),
+    ("Total TTC 120.00  TVA 20%", "invoice"),
+    ("Cash  Amount paid  Customer copy", "receipt"),
+    ("Date valeur  Date operation  Debit", "bank_statement"),
+    ("credit card", "receipt"),
+    ("vat cash", "invoice"),  # Ties go to the type listed first
+])
+def test_fixed_cases_match_the_legacy_rules(classifier, text, doc_type):
+    assert legacy_document_type(text) == doc_type
+    assert classifier.classify(text) == doc_type
+
+
+def test_generated_texts_match_the_legacy_rules(classifier):
+    rng = random.Random(21)
+    for _ in range(5000):
+        text = "".join(rng.choice(FRAGMENTS) + rng.choice(["", " ", "  "]) for _ in range(rng.randint(0, 12)))
+        assert classifier.classify(text) == legacy_document_type(text), text
+
+
+def test_strong_indicators_keep_their_priority(classifier):
+    # Invoice fires first in the text, but receipt ranks higher
+    text = "invoice no 7 facture ... receipt payment method card"
+    assert classifier.predict(text) == ("receipt", 1.0)
+    assert classifier.classify("bank statement rib solde invoice facture") == "invoice"
+
+
+def test_overlapping_keywords_count_every_contained_keyword(classifier):
+    _, hits = classifier.scan("INVOICE NO 42")
+    assert {"invoice no", "invoice"} <= hits
+    _, hits = classifier.scan("paid by credit card")
+    assert {"credit card", "credit"} <= hits
+    # "invoice no" alone completes the invoice strong indicator (anchor "invoice" inside it)
+    assert classifier.predict("invoice no 42") == ("invoice", 1.0)
+
+
+def test_keywords_file_replaces_the_tables(tmp_path, monkeypatch):
+    path = tmp_path / "keywords.json"
+    path.write_text(json.dumps({"keyword_groups": {"invoice": ["widget"], "receipt": ["gadget", "till"]}}), encoding="utf-8")
+    monkeypatch.setattr(doc_classifier, "DOC_KEYWORDS_FILE", str(path))
+
+    classifier = KeywordClassifier()
+    assert classifier.classify("one widget") == "invoice"
+    assert classifier.classify("gadget till widget") == "receipt"
+    assert classifier.classify("vat tva total ttc") == "unknown"  # Default groups replaced
+    assert classifier.classify("receipt transaction id") == "receipt"  # Strong indicators kept
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+from doc_classifier import KeywordClassifier, ModelClassifier, load_classifier
+from doc_model import HashedNgramModel
+
+VOCABULARY = {
+    "invoice": ["quantity", "unit", "price", "supplier", "due", "net", "amount", "order"],
+    "receipt": ["thank", "you", "store", "change", "cashier", "welcome", "visit", "again"],
+}
+
+
+def synthetic_texts(count=40, seed=23):
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for i in range(count):
+        label = sorted(VOCABULARY)[i % 2]
+        texts.append(" ".join(rng.choices(VOCABULARY[label], k=12)))
+        labels.append(label)
+    return texts, labels
+
+
+@pytest.fixture(scope="module")
+def model():
+    texts, labels = synthetic_texts()
+    return HashedNgramModel.fit(texts, labels, n_features=2 ** 12, epochs=100)
+
+
+def test_learns_the_synthetic_types(model):
+    texts, labels = synthetic_texts(seed=7)
+    assert [label for label, _ in model.predict(texts)] == labels
+
+
+def test_save_load_round_trip(model, tmp_path):
+    path = str(tmp_path / "models" / "doc_model.npz")
+    model.save(path)
+    loaded = HashedNgramModel.load(path)
+    texts, _ = synthetic_texts(seed=8)
+    assert loaded.labels == model.labels
+    assert loaded.n_features == model.n_features
+    assert loaded.predict(texts) == model.predict(texts)
+
+
+def test_empty_batch(model):
+    assert model.predict([]) == []
+
+
+def test_text_without_known_features_has_confidence_0(model):
+    assert model.predict(["zebra xylophone 12345", ""]) == [(model.labels[0], 0.0), (model.labels[0], 0.0)]
+
+
+def test_model_classifier_falls_back_to_keywords_below_min_confidence(model):
+    classifier = ModelClassifier(model, KeywordClassifier(), min_confidence=0.6)
+    # Confident model: the keywords ("vat" -> invoice) are not consulted
+    label, confidence = classifier.predict("thank you store cashier welcome vat")
+    assert (label, confidence >= 0.6) == ("receipt", True)
+    # Unknown to the model (confidence 0): keyword rules decide
+    assert classifier.predict("vat tva total ttc") == KeywordClassifier().predict("vat tva total ttc")
+    assert classifier.predict_batch(["zebra", "quantity unit price supplier"])[0] == ("unknown", 0.0)
+
+
+def test_load_classifier_uses_the_model_file_when_it_exists(model, tmp_path):
+    path = str(tmp_path / "doc_model.npz")
+    assert isinstance(load_classifier(path), KeywordClassifier)
+    model.save(path)
+    classifier = load_classifier(path)
+    assert isinstance(classifier, ModelClassifier)
+    assert classifier.model.labels == model.labels
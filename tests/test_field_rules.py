@@ -0,0 +1,61 @@
+import random
+import re
+
+import pytest
+
+from field_rules import BANK_RULESET, BANK_RULES, INVOICE_RULESET, INVOICE_RULES, RECEIPT_RULESET, RECEIPT_RULES, extract_fields
+
+RULESETS = [(INVOICE_RULESET, INVOICE_RULES), (RECEIPT_RULESET, RECEIPT_RULES), (BANK_RULESET, BANK_RULES)]
+TOKENS = [
+    "invoice", "Facture", "N°", "no", "numéro", "Date", "date facture", "Casablanca le", "livraison le", "Delivery Date",
+    "delivery fee", "echeance", "Due Date", "Client", "ICE", "IF", "fournisseur", "Provider", "Issuer", "From", "sous total HT",
+    "Sub Total", "Montant TVA", "VAT Amount", "TVA", "Total TTC", "Total Amount", "total amount paid", "Grand Total",
+    "Remise", "Discount", "Frais divers", "Other charges", "Receipt", "Ticket", "#", "Time", "Address", "Phone",
+    "Payment Method", "Paid by", "cash", "Card", "Statement Date", "Period Covered", "Date Range", "Opening Balance",
+    "Closing Balance", "Currency", "MAD", "EUR", "Account Number", "IBAN", "Account Holder", "Client Name", "Super Mart",
+    "Bakery", "ACME Shop", "12/03/2024", "1-2-24", "31.12.2023", "10:45 PM", "9:05", "1,234.56", "20", "%", "-150.00",
+    "ABC-123/45", "FR76 3000 4000", "café", ":", "-", " ", "  ", "\n", "\n", "\t",
+]
+
+
+def generated_texts(count, seed=6):
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = rng.choices(TOKENS, k=rng.randint(0, 60))
+        yield "".join(word + rng.choice(["", " ", " ", ": ", "\n"]) for word in words)
+
+
+def expected_fields(ruleset, text):
+    """The former parsers: one re.search per field."""
+    results = {}
+    for field, regex, group, _ in ruleset["rules"]:
+        match = regex.search(text)
+        results[field] = match.group(group).strip() if match else "N/A"
+    return results
+
+
+@pytest.mark.parametrize("ruleset, rules", RULESETS, ids=[r["document_type"] for r, _ in RULESETS])
+def test_single_pass_matches_per_field_search(ruleset, rules):
+    for text in generated_texts(3000):
+        assert extract_fields(ruleset, text) == expected_fields(ruleset, text), text
+
+
+@pytest.mark.parametrize("ruleset, rules", RULESETS, ids=[r["document_type"] for r, _ in RULESETS])
+def test_matches_start_with_a_declared_keyword(ruleset, rules):
+    # The scanner only stops at declared keywords: a pattern that can match elsewhere would lose matches
+    for (field, keywords, _, _), (_, regex, _, _) in zip(rules, ruleset["rules"]):
+        if keywords is None:
+            continue
+        for text in generated_texts(500):
+            for match in regex.finditer(text):
+                assert match.group().lower().startswith(tuple(k.lower() for k in keywords)), (field, match.group())
+
+
+def test_fixed_statement_fields():
+    text = "Statement Date: 31/03/2025\nOpening Balance: 1,000.00\nCurrency: MAD\nClosing balance - 500.00"
+    fields = extract_fields(BANK_RULESET, text)
+    assert fields["statement_date"] == "31/03/2025"
+    assert fields["opening_balance"] == "1,000.00"
+    assert fields["closing_balance"] == "500.00"
+    assert fields["currency"] == "MAD"
+    assert fields["account_number"] == "N/A"
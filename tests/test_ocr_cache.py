@@ -0,0 +1,37 @@
+import threading
+
+import ocr_cache
+from word_boxes import WORD_COLUMNS, WordBoxes
+
+
+def _page(text):
+    words = WordBoxes.from_columns({name: [text] if name == "text" else [0] for name in WORD_COLUMNS})
+    return {"text": text, "words": words, "source": "ocr"}
+
+
+def test_concurrent_puts_of_the_same_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_ENABLED", True)
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ocr_cache, "_cache_size", None)
+    key = ocr_cache.page_cache_key("ab" * 32, 0, 200, "eng", "")
+    errors = []
+    start = threading.Barrier(8)
+
+    def put(n):
+        start.wait()
+        try:
+            for _ in range(25):
+                ocr_cache.cache_put(key, _page(f"page {n}"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert ocr_cache.cache_get(key)["text"].startswith("page ")
+    leftovers = [p.name for p in tmp_path.rglob("*") if p.is_file() and not p.name.endswith(".json")]
+    assert leftovers == []
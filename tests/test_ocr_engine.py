@@ -0,0 +1,21 @@
+import ocr_backends
+import ocr_engine
+
+
+def cache_keys(monkeypatch, backend, version):
+    monkeypatch.setattr(ocr_backends, "OCR_BACKEND", backend)
+    monkeypatch.setattr(ocr_backends.BACKENDS[backend], "engine_version", classmethod(lambda cls: version))
+    ocr_backends.ocr_backend_id.cache_clear()
+    return ocr_engine._page_cache_keys(b"%PDF-1.4 same document", 2, 200)
+
+
+def test_cache_keys_depend_on_the_ocr_backend(monkeypatch):
+    monkeypatch.setattr(ocr_engine, "OCR_CACHE_ENABLED", True)
+    try:
+        pytesseract_keys = cache_keys(monkeypatch, "pytesseract", "tesseract 5.3.0")
+        tesserocr_keys = cache_keys(monkeypatch, "tesserocr", "tesseract 5.3.0")
+        upgraded_keys = cache_keys(monkeypatch, "tesserocr", "tesseract 5.4.1")
+    finally:
+        ocr_backends.ocr_backend_id.cache_clear()
+
+    assert len(set(pytesseract_keys + tesserocr_keys + upgraded_keys)) == 6
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from parser_bank import parse_amount, parse_bank_statement, parse_bank_transactions_layout_aware
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSACTION_KEYS = {"date", "description", "amount", "type", "balance"}
+
+
+def text_layer_pages(name):
+    pytest.importorskip("pymupdf")
+    from ocr_engine import perform_ocr_on_pdf_with_data
+    return perform_ocr_on_pdf_with_data(os.path.join(ROOT, "test_files", name))
+
+
+def test_layout_types_follow_the_running_balance():
+    # Amounts are printed between the Debit and Credit headers, all inside the credit band
+    transactions = parse_bank_transactions_layout_aware(text_layer_pages("test/sample_bank_statement_test.pdf"))
+    assert [(t["description"], t["amount"], t["type"], t["balance"]) for t in transactions] == [
+        ("ATM Withdrawal", "200.00", "debit", "4800.00"),
+        ("Salary Payment", "1500.00", "credit", "6300.00"),
+        ("Online Shopping", "100.00", "debit", "6200.00"),
+    ]
+
+
+def test_layout_columns_on_the_sample_statement():
+    transactions = parse_bank_transactions_layout_aware(text_layer_pages("sample-bank-statement.pdf"))
+    assert len(transactions) == 8
+    assert [t["type"] for t in transactions] == ["debit", "debit", "credit", "credit", "debit", "debit", "debit", "debit"]
+    assert transactions[-1]["balance"] == "591,800.00"
+
+
+def test_line_parser_has_the_layout_schema():
+    text = "Opening Balance: 5000.00\nDate  Description  Debit  Credit  Balance\n" \
+           "01/04/2025  ATM Withdrawal  200.00  4800.00\n10/04/2025  Salary  1500.00  6300.00\n"
+    transactions = parse_bank_statement(text)["transactions"]
+    assert all(set(t) == TRANSACTION_KEYS for t in transactions)
+    assert [(t["type"], t["balance"]) for t in transactions] == [("debit", "4800.00"), ("credit", "6300.00")]
+
+
+@pytest.mark.parametrize("text, value", [
+    ("1,234.56", 1234.56), ("1.234,56", 1234.56), ("1 234,56", 1234.56),
+    ("-200.00", -200.0), ("200.00 4800.00", 200.0), ("", None), ("n/a", None),
+])
+def test_parse_amount(text, value):
+    assert parse_amount(text) == value
+
+
+def test_import_does_not_load_numpy():
+    code = "import sys, parser_bank; print('numpy' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
+
+
+def test_header_fields_past_the_cap_without_a_table_header():
+    # Header cells on separate lines: TABLE_HEADER_PATTERN never matches
+    lines = ["Statement Date: 31/03/2025", "Opening Balance: 1000.00", "Date", "Description", "Debit", "Credit", "Balance"]
+    lines += [f"{day % 28 + 1:02d}/03/2025  Payment {day}  1.00  {999 - day}.00" for day in range(300)]
+    lines += ["Closing Balance: 500.00"]
+    header = parse_bank_statement("\n".join(lines))["header"]
+    assert header["closing_balance"] == "500.00"
+    assert header["opening_balance"] == "1000.00"
@@ -0,0 +1,40 @@
+from PIL import Image
+
+import ocr_engine
+import parser_invoice
+from word_boxes import WordBoxes
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.sizes = []
+
+    def image_to_data(self, image, lang, config):
+        self.sizes.append(image.size)
+        return WordBoxes.from_tsv("")
+
+
+def test_table_reocr_keeps_the_table_dpi(monkeypatch):
+    rendered = {}
+
+    def render_pages(source, first_page, last_page, dpi=None, poppler_path=None):
+        rendered["dpi"] = dpi
+        return [Image.new("RGB", (round(8.27 * dpi), round(11.69 * dpi)), "white")]
+
+    backend = RecordingBackend()
+    monkeypatch.setattr(parser_invoice, "render_pages", render_pages)
+    monkeypatch.setattr(ocr_engine, "get_ocr_backend", lambda: backend)
+    # Page normalization would shrink the crop back toward the page-OCR resolution
+    monkeypatch.setattr(ocr_engine, "normalize_image_for_ocr", lambda image: (image.resize((image.width // 2, image.height // 2)), 0.5))
+
+    lines = [
+        {"text": "Désignation  Qté  Prix", "top": 400, "bottom": 420, "left": 100, "right": 1500},
+        {"text": "Widget  2  10.00", "top": 430, "bottom": 450, "left": 100, "right": 1500},
+    ]
+    parser_invoice.reocr_table_region(b"%PDF-1.4", 0, lines, 1, 2)
+
+    factor = parser_invoice.TABLE_DPI / ocr_engine.OCR_DPI
+    margin = parser_invoice.TABLE_MARGIN
+    assert rendered["dpi"] == parser_invoice.TABLE_DPI
+    assert backend.sizes == [(int((1500 + margin) * factor) - int((100 - margin) * factor),
+                              int((450 + margin) * factor) - int((400 - margin) * factor))]
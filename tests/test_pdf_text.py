@@ -0,0 +1,60 @@
+import io
+
+import pytest
+
+pymupdf = pytest.importorskip("pymupdf")
+from PIL import Image
+
+import pdf_text
+from pdf_text import extract_pdf_text_layer
+
+STAMP = "EXHIBIT 12 Bates ACME000123 confidential"
+
+
+def _scan_png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (850, 1100), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def make_pdf(scanned, lines):
+    doc = pymupdf.open()
+    page = doc.new_page()
+    if scanned:
+        page.insert_image(page.rect, stream=_scan_png())
+    for i, line in enumerate(lines):
+        page.insert_text((40, 40 + 14 * i), line, fontsize=11)
+    return doc.tobytes()
+
+
+@pytest.fixture(autouse=True)
+def text_layer_on(monkeypatch):
+    monkeypatch.setattr(pdf_text, "PDF_TEXT_LAYER", True)
+
+
+def test_born_digital_page_uses_the_text_layer():
+    pages = extract_pdf_text_layer(make_pdf(False, [STAMP]), dpi=200)
+    assert pages[0] is not None
+
+
+def test_scanned_page_with_a_stamp_is_ocred():
+    assert extract_pdf_text_layer(make_pdf(True, [STAMP]), dpi=200) == [None]
+
+
+def test_searchable_scan_uses_the_text_layer():
+    lines = [f"Line {i} of the recognized invoice text, quantity {i} price {i * 3}.00 total due" for i in range(40)]
+    pages = extract_pdf_text_layer(make_pdf(True, lines), dpi=200)
+    assert pages[0] is not None
+
+
+def test_text_layer_stage_logs_its_page_counts(monkeypatch):
+    import instrumentation
+    from ocr_engine import stream_pdf_page_data
+    logged = []
+    monkeypatch.setattr(instrumentation, "INSTRUMENTATION_ENABLED", True)
+    monkeypatch.setattr(instrumentation, "log_record", logged.append)
+
+    page_count, pages = stream_pdf_page_data(make_pdf(False, [STAMP]))
+    list(pages)
+    record = next(r for r in logged if r["stage"] == "extract_pdf_text_layer")
+    assert (record["pages"], record["native_pages"]) == (page_count, 1)
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import pipeline as pipeline_module
+from pipeline import Pipeline
+from word_boxes import WordBoxes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RECEIPT_RUN = """
+import sys
+from pipeline import Pipeline
+from word_boxes import WORD_COLUMNS, WordBoxes
+
+text = "RECEIPT\\nPayment method: cash\\nTotal 12.50"
+page = {"text": text, "words": WordBoxes.from_columns({name: [] for name in WORD_COLUMNS})}
+with Pipeline() as pipeline:
+    result = pipeline.process(b"", name="receipt.png", ocr_pages=[page], raise_errors=True)
+print(result.document_type, *sorted(m for m in ("parser_receipt", "parser_invoice", "parser_bank") if m in sys.modules))
+"""
+
+
+def test_parsers_load_per_document_type(tmp_path):
+    # Run outside the repository so the logs/ it writes are not the tracked ones
+    env = {**os.environ, "INSTRUMENTATION": "0", "OCR_CACHE": "0",
+           "PYTHONPATH": os.pathsep.join(filter(None, (ROOT, os.environ.get("PYTHONPATH"))))}
+    output = subprocess.run([sys.executable, "-c", RECEIPT_RUN], cwd=tmp_path, env=env, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["receipt", "parser_receipt"]
+
+
+class FakeBackend:
+    """Every page reads as a receipt; records the Tesseract config of each call."""
+
+    def __init__(self):
+        self.configs = []
+
+    def image_to_data(self, image, lang, config):
+        self.configs.append(config)
+        rows = [f"5\t1\t1\t1\t1\t{i + 1}\t{40 + 90 * i}\t40\t80\t20\t95\t{word}"
+                for i, word in enumerate(["RECEIPT", "Payment", "method:", "cash"])]
+        return WordBoxes.from_tsv("\n".join(rows))
+
+
+def scanned_pdf(page_count):
+    pymupdf = pytest.importorskip("pymupdf")
+    doc = pymupdf.open()
+    for _ in range(page_count):
+        doc.new_page(width=200, height=200)
+    return doc.tobytes()
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch, tmp_path):
+    import ocr_cache
+    import ocr_engine
+    import pdf_text
+
+    backend = FakeBackend()
+    hashes = []
+
+    def content_sha256(source):
+        hashes.append(len(source))
+        return "ab" * 32
+
+    monkeypatch.setattr(ocr_engine, "get_ocr_backend", lambda: backend)
+    monkeypatch.setattr(ocr_engine, "OCR_NORMALIZE", False)
+    monkeypatch.setattr(pdf_text, "PDF_TEXT_LAYER", False)
+    for module in (ocr_cache, ocr_engine):
+        monkeypatch.setattr(module, "OCR_CACHE_ENABLED", True)
+        monkeypatch.setattr(module, "content_sha256", content_sha256)
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_DIR", str(tmp_path))
+    backend.hashes = hashes
+    return backend
+
+
+def test_progressive_ocr_keeps_every_receipt_page(fake_ocr):
+    with Pipeline(ocr_workers=1, progressive=True) as pipeline:
+        result = pipeline.process(scanned_pdf(4), name="receipt.pdf", raise_errors=True)
+
+    assert result.document_type == "receipt"
+    assert result.pages == 4 and result.text.count("RECEIPT") == 4
+    assert len(fake_ocr.configs) == 4   # Page 1 is not OCRed twice
+    assert len(fake_ocr.hashes) == 1    # One content hash for all cache keys
+
+
+def test_narrowed_page_plan_reocrs_only_planned_pages(fake_ocr, monkeypatch):
+    monkeypatch.setitem(pipeline_module.PAGE_PLANS, "receipt", {"pages": "first_last", "config": "--psm 4"})
+    with Pipeline(ocr_workers=1, progressive=True) as pipeline:
+        result = pipeline.process(scanned_pdf(4), name="receipt.pdf", raise_errors=True)
+
+    assert result.text.count("RECEIPT") == 2
+    assert fake_ocr.configs[1:] == ["--psm 4"]
+    assert len(fake_ocr.hashes) == 1
@@ -0,0 +1,21 @@
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("fitz")  # Text-layer PDF: no Tesseract needed
+
+from service import run_job
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_run_job_reports_the_upload_filename(tmp_path):
+    spooled = tmp_path / "tmpk3j2x9q1.pdf"
+    shutil.copy(os.path.join(ROOT, "test_files", "sample-bank-statement.pdf"), spooled)
+
+    document_type, output, _ = run_job(str(spooled), "March statement.pdf")
+
+    assert document_type == "bank_statement"
+    assert output["metadata"]["source_file"] == "March statement.pdf"
@@ -0,0 +1,64 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from parser_invoice import LINE_TOLERANCE, extract_lines_with_boxes
+from word_boxes import WORD_COLUMNS, WordBoxes
+
+
+def legacy_lines(tops, lefts, texts):
+    """The original iterrows() grouping (baseline parser_invoice), on plain lists."""
+    lines = defaultdict(list)
+    for y, left, text in zip(tops, lefts, texts):
+        line_id = y
+        for key in lines:
+            if abs(key - y) < LINE_TOLERANCE:
+                line_id = key
+                break
+        lines[line_id].append((left, text))
+    return ["  ".join(word for _, word in sorted(words, key=lambda x: x[0])) for _, words in sorted(lines.items())]
+
+
+def word_boxes(tops, lefts, texts):
+    columns = {name: [0] * len(tops) for name in WORD_COLUMNS}
+    columns.update(top=tops, left=lefts, text=texts, width=[30] * len(tops), height=[12] * len(tops))
+    return WordBoxes.from_columns(columns)
+
+
+FIXTURES = [
+    # Words above and below the first word of a line, in OCR order
+    ([100, 107, 93], [0, 10, 20]),
+    ([93, 100, 107], [0, 10, 20]),
+    # A chain of small steps: each word is close to the previous one, not to the anchor
+    ([10, 15, 20, 25, 30], [50, 40, 30, 20, 10]),
+    # Two lines whose anchors are exactly one tolerance apart
+    ([50, 58, 50, 58], [0, 0, 40, 40]),
+    # Equal lefts keep OCR order
+    ([200, 203, 198], [5, 5, 5]),
+    # A word between two existing lines joins the one created first
+    ([300, 314, 307], [0, 0, 100]),
+    ([314, 300, 307], [0, 0, 100]),
+]
+
+
+@pytest.mark.parametrize("tops, lefts", FIXTURES)
+def test_visual_lines_match_legacy_grouping(tops, lefts):
+    texts = [f"w{i}" for i in range(len(tops))]
+    assert extract_lines_with_boxes(word_boxes(tops, lefts, texts)) == legacy_lines(tops, lefts, texts)
+
+
+def test_visual_lines_match_legacy_grouping_on_jittered_layouts():
+    rng = np.random.default_rng(5)
+    for _ in range(500):
+        count = int(rng.integers(1, 80))
+        tops = (rng.integers(0, 15, size=count) * 14 + rng.integers(-4, 5, size=count)).tolist()
+        lefts = rng.integers(0, 600, size=count).tolist()
+        texts = [f"w{i}" for i in range(count)]
+        assert extract_lines_with_boxes(word_boxes(tops, lefts, texts)) == legacy_lines(tops, lefts, texts)
+
+
+def test_visual_lines_starts():
+    words, starts = word_boxes([100, 107, 93, 140], [0, 10, 20, 0], list("ABCD")).visual_lines(LINE_TOLERANCE)
+    assert words["text"].tolist() == ["A", "B", "C", "D"]
+    assert starts.tolist() == [0, 3]
@@ -0,0 +1,133 @@
+# word_boxes.py
+
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+# Columns of Tesseract's image_to_data / TSV output
+WORD_COLUMNS = ["level", "page_num", "block_num", "par_num", "line_num", "word_num",
+                "left", "top", "width", "height", "conf", "text"]
+FLOAT_COLUMNS = {"conf"}
+TEXT_COLUMNS = {"text"}
+
+
+def _column_array(name, values):
+    if name in TEXT_COLUMNS:
+        # NaN / None (empty cells in DataFrame input) become empty strings
+        return np.array(["" if v is None or v != v else str(v) for v in values], dtype=object)
+    if name in FLOAT_COLUMNS:
+        return np.asarray(values, dtype=np.float64).reshape(-1)
+    return np.asarray(values, dtype=np.float64).round().astype(np.int64).reshape(-1)
+
+
+class WordBoxes:
+    """
+    Word boxes with one numpy array per column, a light stand-in for the
+    image_to_data DataFrame. words["top"] returns a column; indexing with a
+    boolean mask or an index array returns the selected rows.
+    """
+    __slots__ = ("columns",)
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_columns(cls, data):
+        """Build from a mapping of column name to values (dict of lists, DataFrame, ...)."""
+        return cls({name: _column_array(name, data[name]) for name in WORD_COLUMNS})
+
+    @classmethod
+    def from_tsv(cls, tsv):
+        """Parse Tesseract TSV output, with or without its header row."""
+        rows = [line.split("\t", len(WORD_COLUMNS) - 1) for line in tsv.splitlines() if line]
+        if rows and rows[0][0] == "level":
+            rows = rows[1:]
+
+        # All numeric cells in one conversion; non-word rows may lack the (empty) text cell
+        numbers = np.array([row[:-1] if len(row) == len(WORD_COLUMNS) else row for row in rows], dtype=np.float64)
+        numbers = numbers.reshape(len(rows), len(WORD_COLUMNS) - 1)
+        columns = {
+            name: numbers[:, i] if name in FLOAT_COLUMNS else numbers[:, i].astype(np.int64)
+            for i, name in enumerate(WORD_COLUMNS[:-1])
+        }
+        columns["text"] = np.array([row[-1] if len(row) == len(WORD_COLUMNS) else "" for row in rows], dtype=object)
+        return cls(columns)
+
+    @classmethod
+    def coerce(cls, words):
+        """Return words as WordBoxes (accepts an image_to_data DataFrame too)."""
+        return words if isinstance(words, cls) else cls.from_columns(words)
+
+    def __len__(self):
+        return len(self.columns["text"])
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return WordBoxes({name: values[key] for name, values in self.columns.items()})
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def assign(self, **columns):
+        """Copy with some columns replaced."""
+        return WordBoxes({**self.columns, **{name: _column_array(name, v) for name, v in columns.items()}})
+
+    def has_text(self):
+        """Boolean mask of rows whose text is not blank."""
+        return np.fromiter((bool(t.strip()) for t in self.columns["text"]), dtype=bool, count=len(self))
+
+    def line_groups(self):
+        """
+        Row indexes per OCR line (block, paragraph, line), in order of first
+        appearance, like DataFrame.groupby(..., sort=False).
+        """
+        if self.empty:
+            return []
+        keys = np.stack([self.columns["block_num"], self.columns["par_num"], self.columns["line_num"]], axis=1)
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        group_ids = np.argsort(np.argsort(first))[inverse.reshape(-1)]
+        order = np.argsort(group_ids, kind="stable")
+        return np.split(order, np.flatnonzero(np.diff(group_ids[order])) + 1)
+
+    def visual_lines(self, tolerance):
+        """
+        Group words into visual lines by position, in OCR order: a word joins the
+        earliest-created line whose anchor (the top of its first word) is less than
+        tolerance px away, otherwise it starts a new line anchored at its own top.
+        Returns the words ordered by line anchor, then left to right (ties keep OCR
+        order), and the index where each line starts.
+        """
+        if self.empty:
+            return self, np.zeros(0, dtype=np.int64)
+
+        # Anchors are kept sorted and at least tolerance apart, so a word has at
+        # most two candidate lines: bisect instead of scanning every line
+        anchors, created = [], []
+        line_anchor = np.empty(len(self), dtype=np.float64)
+        for i, top in enumerate(self.columns["top"].tolist()):
+            pos = bisect_right(anchors, top - tolerance)
+            best = None
+            while pos < len(anchors) and anchors[pos] < top + tolerance:
+                if best is None or created[pos] < created[best]:
+                    best = pos
+                pos += 1
+            if best is None:
+                pos = bisect_left(anchors, top)
+                anchors.insert(pos, top)
+                created.insert(pos, len(created))
+                line_anchor[i] = top
+            else:
+                line_anchor[i] = anchors[best]
+
+        order = np.lexsort((self.columns["left"], line_anchor))
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(line_anchor[order])) + 1))
+        return self[order], starts
+
+    def to_dict(self):
+        """JSON-serializable columns (dict of lists)."""
+        return {name: values.tolist() for name, values in self.columns.items()}
+
+    def to_dataframe(self):
+        import pandas as pd  # Optional: only needed for DataFrame export
+        return pd.DataFrame(self.columns)